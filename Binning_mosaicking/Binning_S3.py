@@ -1,13 +1,16 @@
 # import relevant packages
 import numpy as np
 import os
-from os.path import exists
 import subprocess
-from datetime import datetime
 import shutil
 import argparse 
 import csv
 import glob
+import sys
+import xml.etree.ElementTree as ET
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'extra'))
+from flag_mask import flag_coding_from_netcdf, compare_mask_expr
 
 #add by Emma for command line arguments
 
@@ -85,6 +88,22 @@ if not files:
     log_status(f"{year}{month}{day}", area, "NO_INPUT_FILES")
     exit(0)
 
+# Check that the binning maskExpr masks the same flags as clean_satellite.py
+mask_exprs = [e.text for e in ET.parse(xmlfile).iter('maskExpr') if e.text]
+if mask_exprs:
+    try:
+        coding = flag_coding_from_netcdf(files[0])
+    except Exception as e:
+        print(f"Could not read flag coding from {files[0]}: {e}")
+        coding = None
+    diff = compare_mask_expr(mask_exprs[-1], coding=coding or None)
+    if diff is not None:
+        only_in_patterns, only_in_expr = diff
+        if only_in_patterns:
+            print(f"Flags masked in clean_satellite.py but not in maskExpr: {only_in_patterns}")
+        if only_in_expr:
+            print(f"Flags masked in maskExpr but not in clean_satellite.py: {only_in_expr}")
+
 # def call_subprocess(command_string):
 #     try:
 #         subprocess.call(command_string)
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from nve_store import load_discharge
+
+
+# per-group sum and count of the non-NaN values, keyed by integer codes
+def _group_sum_count(codes, values, n_groups):
+    valid = ~np.isnan(values)
+    sums = np.bincount(codes[valid], weights=values[valid], minlength=n_groups)
+    counts = np.bincount(codes[valid], minlength=n_groups)
+    return sums, counts
+
+
+# cumulative sum of value within each (station, year) run of a table sorted by station/datetime
+def _cumsum_by_run(run_codes, values):
+    filled = np.where(np.isnan(values), 0.0, values)
+    total = np.cumsum(filled)
+
+    # subtract the running total reached before each run starts
+    starts = np.flatnonzero(np.r_[True, run_codes[1:] != run_codes[:-1]])
+    offsets = np.r_[0.0, total[starts[1:] - 1]]
+    run_lengths = np.diff(np.r_[starts, len(values)])
+    out = total - np.repeat(offsets, run_lengths)
+
+    # keep NaN where the daily value is missing (same as groupby().cumsum())
+    out[np.isnan(values)] = np.nan
+    return out
+
+
+def discharge_stats(df, years=None):
+    """
+    Discharge statistics from one long table of station_id, datetime, value.
+
+    Returns a dict with
+      daily               : input rows + year, month, day_of_year, cumulative_discharge
+      mean_cumulative     : mean cumulative discharge over stations per (year, day_of_year)
+      mean_daily          : mean daily discharge over stations per (year, day_of_year)
+      annual_totals       : total discharge per year (all stations)
+      station_year_totals : total discharge per (station_id, year)
+    """
+
+    df = df[["station_id", "datetime", "value"]]
+    if years is not None:
+        df = df[df["datetime"].dt.year.isin(list(years))]
+    df = df.sort_values(["station_id", "datetime"], kind="stable").reset_index(drop=True)
+
+    station = df["station_id"].astype(str).to_numpy()
+    dt = df["datetime"].dt
+    year = dt.year.to_numpy()
+    doy = dt.dayofyear.to_numpy()
+    values = df["value"].to_numpy(dtype=float)
+
+    station_codes, station_uniques = pd.factorize(station, sort=True)
+    year_min = int(year.min()) if len(year) else 0
+    year_codes = year - year_min
+    n_years = int(year_codes.max()) + 1 if len(year) else 0
+
+    # (station, year) runs -> cumulative discharge in one pass
+    station_year_codes = station_codes * n_years + year_codes
+    cumulative = _cumsum_by_run(station_year_codes, values)
+
+    daily = df.assign(
+        year=year,
+        month=dt.month.to_numpy(),
+        day_of_year=doy,
+        cumulative_discharge=cumulative,
+    )
+
+    # (year, day_of_year) aligned means over stations
+    doy_codes = year_codes * 367 + doy
+    n_doy = n_years * 367
+    cum_sum, cum_count = _group_sum_count(doy_codes, cumulative, n_doy)
+    val_sum, val_count = _group_sum_count(doy_codes, values, n_doy)
+    present = np.flatnonzero(np.bincount(doy_codes, minlength=n_doy))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        doy_frame = pd.DataFrame({
+            "year": present // 367 + year_min,
+            "day_of_year": present % 367,
+            "cumulative_discharge": cum_sum[present] / cum_count[present],
+            "value": val_sum[present] / val_count[present],
+        })
+
+    mean_cumulative = doy_frame[["year", "day_of_year", "cumulative_discharge"]]
+    mean_daily = doy_frame[["year", "day_of_year", "value"]]
+
+    # annual totals (all stations) and per station-year
+    year_sum, _ = _group_sum_count(year_codes, values, n_years)
+    years_present = np.flatnonzero(np.bincount(year_codes, minlength=n_years))
+    annual_totals = pd.Series(
+        year_sum[years_present],
+        index=pd.Index(years_present + year_min, name="year"),
+        name="value",
+    )
+
+    sy_sum, _ = _group_sum_count(station_year_codes, values, len(station_uniques) * n_years)
+    sy_present = np.flatnonzero(np.bincount(station_year_codes, minlength=len(station_uniques) * n_years))
+    station_year_totals = pd.DataFrame({
+        "station_id": station_uniques[sy_present // n_years] if n_years else [],
+        "year": sy_present % n_years + year_min if n_years else [],
+        "value": sy_sum[sy_present],
+    })
+
+    return {
+        "daily": daily,
+        "mean_cumulative": mean_cumulative,
+        "mean_daily": mean_daily,
+        "annual_totals": annual_totals,
+        "station_year_totals": station_year_totals,
+    }
+
+
+# read the stations / years needed from the NVE store and compute the stats
+def load_discharge_stats(stations=None, years=None, **kwargs):
+    df = load_discharge(stations=stations, years=years, columns=["value"], **kwargs)
+    return discharge_stats(df, years=years)
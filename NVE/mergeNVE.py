@@ -1,27 +1,18 @@
-import pandas as pd
-import glob
-import os
+from nve_store import discharge_folder, store_path, metadata_csv, manifest_path, ingest_discharge, update_discharge
 
-# Folder containing all your Excel files
-folder_path = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/NVE_data/discharge"
+# "incremental": only parse new or changed csv files (tracked in the manifest by
+# size, mtime and sha1) and upsert their rows per station.
+# "full": re-parse everything and rebuild the dataset from scratch.
+mode = "incremental"
 
-# Get all CSV files in the folder
-csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
+# Parse the NVE discharge csv files (typed, parsed datetimes) into a Parquet
+# dataset partitioned by station_id/year with the station metadata joined in.
+# Downstream scripts read it with nve_store.load_discharge(stations=..., years=...)
+if mode == "full":
+    merged_df = ingest_discharge(discharge_folder, store_path, metadata_csv, manifest_path)
+elif mode == "incremental":
+    merged_df = update_discharge(discharge_folder, store_path, metadata_csv, manifest_path)
+else:
+    raise ValueError("mode must be 'incremental' or 'full'")
 
-# List to hold data from each file
-dataframes = []
-
-# Loop through each file and read it
-for file in csv_files:
-    df = pd.read_csv(file)
-    df['Source_File'] = os.path.basename(file)  # optional: keep track of source
-    dataframes.append(df)
-
-# Concatenate all DataFrames
-merged_df = pd.concat(dataframes, ignore_index=True)
-
-# Save to a new CSV file
-output_file = "NVE_discharge_merged.csv"
-merged_df.to_csv(output_file, index=False)
-
-print(f"Merged {len(csv_files)} files into {output_file}")
\ No newline at end of file
+print(f"NVE discharge store: {store_path}")
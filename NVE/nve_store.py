@@ -0,0 +1,281 @@
+import os
+import glob
+import json
+import shutil
+import hashlib
+import pandas as pd
+
+# Raw NVE downloads, station metadata from q1_get_daily_NVE_data and the Parquet store
+discharge_folder = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/NVE_data/discharge"
+metadata_csv = os.path.join(discharge_folder, "discharge_stations_metadata.csv")
+store_path = os.path.join(discharge_folder, "parquet", "NVE_discharge")
+manifest_path = os.path.join(discharge_folder, "parquet", "NVE_discharge_manifest.json")
+
+# Columns written by nivapy.da.query_nve_hydapi (only the ones present are read)
+NVE_DTYPES = {
+    "station_id": "string",
+    "station_name": "string",
+    "parameter": "Int32",
+    "parameter_name": "string",
+    "parameter_name_eng": "string",
+    "unit": "string",
+    "value": "float64",
+    "correction": "Int16",
+    "quality": "Int16",
+}
+
+PARTITION_COLS = ["station_id", "year"]
+
+
+# HydAPI ids can carry a version suffix ("72.77.0 Versjon 1" -> "72.77.0")
+def normalise_station_id(station_id):
+    parts = str(station_id).split()
+    return parts[0] if parts else ""
+
+
+# "Q_daily-mean_ Flåm bru_ Flåm bru_72.77.0 Versjon 1_download-2025-09-24.csv" -> "72.77.0"
+def station_id_from_filename(filename):
+    parts = os.path.basename(filename).split("_")
+    if len(parts) < 5:
+        return os.path.splitext(os.path.basename(filename))[0]
+    return normalise_station_id(parts[4])
+
+
+# parse one NVE csv with explicit dtypes and naive datetimes
+def read_discharge_csv(file):
+    df = pd.read_csv(
+        file,
+        usecols=lambda c: c in NVE_DTYPES or c == "datetime",
+        dtype=NVE_DTYPES,
+    )
+
+    # station id from the csv (file name as fallback), normalised like the metadata
+    ids = df["station_id"].dropna().unique() if "station_id" in df.columns else []
+    if len(ids) == 1:
+        df["station_id"] = normalise_station_id(ids[0])
+    else:
+        df["station_id"] = station_id_from_filename(file)
+    df["datetime"] = pd.to_datetime(df["datetime"], utc=True).dt.tz_localize(None)
+    df["year"] = df["datetime"].dt.year.astype("int16")
+    df["source_file"] = os.path.basename(file)
+
+    return df
+
+
+def read_station_metadata(path=metadata_csv):
+    if not os.path.exists(path):
+        print(f"No station metadata found at {path}, skipping join.")
+        return None
+
+    meta = pd.read_csv(path, index_col=0)
+    meta["station_id"] = meta["station_id"].map(normalise_station_id)
+    return meta.drop_duplicates(subset="station_id")
+
+
+def join_station_metadata(df, meta):
+    if meta is None:
+        return df
+
+    meta_cols = ["station_id"] + [c for c in meta.columns if c not in df.columns]
+    return df.merge(meta[meta_cols], on="station_id", how="left")
+
+
+def list_discharge_files(folder=discharge_folder, meta_path=metadata_csv):
+    csv_files = sorted(glob.glob(os.path.join(folder, "*.csv")))
+    return [f for f in csv_files if os.path.abspath(f) != os.path.abspath(meta_path)]
+
+
+def file_hash(file, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(file, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_signature(file):
+    st = os.stat(file)
+    return {"size": st.st_size, "mtime": st.st_mtime, "sha1": file_hash(file)}
+
+
+def read_manifest(path=manifest_path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def write_manifest(manifest, path=manifest_path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=1, ensure_ascii=False)
+
+
+def ingest_discharge(folder=discharge_folder, out_path=store_path, meta_path=metadata_csv,
+                     manifest_file=manifest_path):
+    csv_files = list_discharge_files(folder, meta_path)
+
+    dataframes = []
+    manifest = {}
+    for file in csv_files:
+        try:
+            dataframes.append(read_discharge_csv(file))
+            manifest[os.path.basename(file)] = file_signature(file)
+        except Exception as e:
+            print(f"Error processing file {file}: {e}")
+
+    if not dataframes:
+        raise FileNotFoundError(f"No NVE discharge csv files found in {folder}")
+
+    df = pd.concat(dataframes, ignore_index=True)
+    df = df.drop_duplicates(subset=["station_id", "datetime"], keep="last")
+    df = join_station_metadata(df, read_station_metadata(meta_path))
+
+    # full rebuild of the dataset
+    if os.path.exists(out_path):
+        shutil.rmtree(out_path)
+    df.to_parquet(out_path, partition_cols=PARTITION_COLS, index=False)
+    write_manifest(manifest, manifest_file)
+
+    print(f"Ingested {len(csv_files)} files ({len(df)} rows) into {out_path}")
+    return df
+
+
+# files that are new or whose content changed since the last merge
+def changed_discharge_files(csv_files, manifest):
+    changed = []
+    for file in csv_files:
+        entry = manifest.get(os.path.basename(file))
+        st = os.stat(file)
+
+        # size + mtime unchanged -> trust the manifest without hashing
+        if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime:
+            continue
+
+        sig = file_signature(file)
+        if entry and entry["sha1"] == sig["sha1"]:
+            entry["mtime"] = sig["mtime"]  # touched but identical
+            continue
+
+        changed.append((file, sig))
+    return changed
+
+
+# rewrite one station's partitions with its existing rows + the new rows (df_new=None: only
+# drop the rows of drop_files, e.g. files deleted from the download folder)
+def upsert_station(df_new, station_id, out_path=store_path, drop_files=()):
+    station_dir = os.path.join(out_path, f"station_id={station_id}")
+    replaced = set(drop_files) | (set(df_new["source_file"].unique()) if df_new is not None else set())
+
+    if os.path.exists(station_dir):
+        df_old = load_discharge(stations=[station_id], path=out_path)
+        # a re-downloaded file replaces the rows it delivered before
+        df_old = df_old[~df_old["source_file"].isin(replaced)]
+        df_station = pd.concat([df_old, df_new], ignore_index=True) if df_new is not None else df_old
+    else:
+        df_station = df_new
+
+    if df_station is None or df_station.empty:
+        if os.path.exists(station_dir):
+            shutil.rmtree(station_dir)
+        return 0
+
+    df_station = (
+        df_station.sort_values("datetime", kind="stable")
+        .drop_duplicates(subset=["station_id", "datetime"], keep="last")
+    )
+
+    # write next to the store ("_" prefix: not read as a partition) and swap the station
+    # folder in afterwards, so a failed write leaves the old partition untouched
+    tmp_root = os.path.join(out_path, f"_tmp_{os.getpid()}")
+    try:
+        df_station.to_parquet(tmp_root, partition_cols=PARTITION_COLS, index=False)
+        new_dir = os.path.join(tmp_root, os.listdir(tmp_root)[0])
+        if os.path.exists(station_dir):
+            os.replace(station_dir, os.path.join(tmp_root, "_old"))
+        os.replace(new_dir, station_dir)
+    finally:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+    return len(df_station)
+
+
+# stations whose partitions hold rows of the given source files
+def stations_with_files(files, out_path=store_path):
+    if not files:
+        return []
+    df = pd.read_parquet(out_path, columns=["station_id", "source_file"], filters=[("source_file", "in", list(files))])
+    return sorted(df["station_id"].astype(str).unique())
+
+
+def update_discharge(folder=discharge_folder, out_path=store_path, meta_path=metadata_csv,
+                     manifest_file=manifest_path):
+    """
+    Merge new / changed csv files into the store, one station at a time.
+    Files listed in the manifest that are no longer in the folder have their
+    rows removed from the store and are dropped from the manifest.
+    """
+
+    manifest = read_manifest(manifest_file)
+    if not manifest or not os.path.exists(out_path):
+        print("No existing store/manifest, doing a full ingest.")
+        return ingest_discharge(folder, out_path, meta_path, manifest_file)
+
+    csv_files = list_discharge_files(folder, meta_path)
+    changed = changed_discharge_files(csv_files, manifest)
+    present = {os.path.basename(f) for f in csv_files}
+    deleted = [name for name in manifest if name not in present]
+
+    if not changed and not deleted:
+        write_manifest(manifest, manifest_file)
+        print("NVE store is up to date, nothing to merge.")
+        return None
+
+    dataframes = []
+    for file, sig in changed:
+        try:
+            dataframes.append(read_discharge_csv(file))
+            manifest[os.path.basename(file)] = sig
+        except Exception as e:
+            print(f"Error processing file {file}: {e}")
+
+    df_new = None
+    if dataframes:
+        df_new = pd.concat(dataframes, ignore_index=True)
+        df_new = join_station_metadata(df_new, read_station_metadata(meta_path))
+        for station_id, df_station in df_new.groupby("station_id"):
+            n_rows = upsert_station(df_station, station_id, out_path, drop_files=deleted)
+            print(f"Upserted station {station_id}: {n_rows} rows")
+
+    if deleted:
+        merged = set() if df_new is None else set(df_new["station_id"].unique())
+        for station_id in stations_with_files(deleted, out_path):
+            if station_id not in merged:
+                n_rows = upsert_station(None, station_id, out_path, drop_files=deleted)
+                print(f"Removed rows of deleted files from station {station_id}: {n_rows} rows left")
+        for name in deleted:
+            manifest.pop(name)
+        print(f"Dropped {len(deleted)} deleted files from the store")
+
+    write_manifest(manifest, manifest_file)
+    print(f"Parsed {len(dataframes)} new/changed files out of {len(csv_files)}")
+    return df_new
+
+
+# read only the stations / years / columns asked for
+def load_discharge(stations=None, years=None, columns=None, path=store_path):
+    filters = []
+    if stations is not None:
+        filters.append(("station_id", "in", [str(s) for s in stations]))
+    if years is not None:
+        filters.append(("year", "in", [int(y) for y in years]))
+
+    if columns is not None:
+        columns = list(dict.fromkeys(["datetime"] + list(columns) + PARTITION_COLS))
+
+    df = pd.read_parquet(path, columns=columns, filters=filters or None)
+
+    # partition keys come back as categoricals
+    df["station_id"] = df["station_id"].astype(str)
+    df["year"] = df["year"].astype(int)
+
+    return df.sort_values(["station_id", "datetime"]).reset_index(drop=True)
@@ -4,6 +4,8 @@ import numpy as np
 import pandas as pd
 from netCDF4 import Dataset
 
+from flag_mask import combined_valid_mask
+
 main_folder = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/L3_daily"
 
 target_lat = 61.365111
@@ -43,7 +45,7 @@ for root, _, files in os.walk(main_folder):
                 lat = ds.variables["lat"][:]
                 lon = ds.variables["lon"][:]
 
-                combined_mask = None
+                fields = []
 
                 # Build combined mask across all parameters
                 for vname in PARAMETERS:
@@ -60,11 +62,9 @@ for root, _, files in os.walk(main_folder):
                     if np.ma.is_masked(data):
                         data = data.filled(np.nan)
 
-                    valid = np.isfinite(data)
-                    if combined_mask is None:
-                        combined_mask = valid.copy()
-                    else:
-                        combined_mask &= valid
+                    fields.append(data)
+
+                combined_mask = combined_valid_mask(fields)
 
                 # Target pixel window
                 lat_idx = np.argmin(np.abs(lat - target_lat))
@@ -1,59 +1,64 @@
 import pandas as pd
-import re
+from flag_mask import DEFAULT_MASK_PATTERNS, flag_coding_from_netcdf, masked_flag_names
+from row_dedup import drop_duplicate_rows_chunked, iter_excel_chunks
+from stream_clean import clean_and_aggregate, param_cols
+from data_cache import satellite_xlsx, write_satellite_parquet
+
+raw_path = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/Sentinel3_pixelextractions_raw.xlsx"
+
+# None -> read the whole sheet; a row count -> read and deduplicate chunk by chunk
+# (for extractions that do not fit in memory use stream_clean.py)
+chunk_size = None
+
+# Also write the Excel copies of the two outputs (the scripts read the Parquet ones)
+write_excel = False
 
 # === 1. Load original data ===
-df = pd.read_excel(
-    "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/Sentinel3_pixelextractions_raw.xlsx"
-)
-
-# === 2. Check and remove duplicates (excluding CALVALUS_ID) ===
-df_no_id = df.drop(columns=["CALVALUS_ID"])
-num_duplicates = df_no_id.duplicated().sum()
-print(f"Found {num_duplicates} duplicate rows (excluding CALVALUS_ID).")
-
-# Remove duplicates based on all columns except CALVALUS_ID
-df_cleaned = df.drop_duplicates(subset=df.columns.difference(["CALVALUS_ID"]))
-print(f"After removing duplicates: {len(df_cleaned)} rows remain.")
-
-# === 3. Define Sentinel-3 flags to mask ===
-mask_patterns = [
-    "quality_flags.invalid",
-    "quality_flags.cosmetic",
-    "quality_flags.duplicated",
-    "quality_flags.sun_glint_risk",
-    "quality_flags.straylight_risk",
-    "quality_flags.saturated_",
-    "pixel_classif_flags.IDEPIX_INVALID",
-    "pixel_classif_flags.IDEPIX_CLOUD",
-    "pixel_classif_flags.IDEPIX_CLOUD_SHADOW",
-    "pixel_classif_flags.IDEPIX_SNOW_ICE",
-    "pixel_classif_flags.IDEPIX_MOUNTAIN_SHADOW",
-    "c2rcc_flags.Rtosa_OOS",
-    "c2rcc_flags.Rhow_OOS",
-    "c2rcc_flags.Iop_OOR",
-    "c2rcc_flags.Rhow_OOR",
-    "c2rcc_flags.*_at_max",
-    "c2rcc_flags.*_at_min",
-    "c2rcc_flags.Cloud_risk",
-    "mph_chl_flags.mph_adjacency",
-]
-
-# === 4. Identify flag columns matching any pattern ===
-bad_flag_cols = [
-    col for col in df_cleaned.columns
-    if any(re.search(pat.replace("*", ".*"), col) for pat in mask_patterns)
-]
-
-print(f"Applying mask using {len(bad_flag_cols)} flag columns.")
-
-# === 5. Keep only good pixels (no bad flags set) ===
-good_mask = (df_cleaned[bad_flag_cols].sum(axis=1) == 0)
-df_flagged_clean = df_cleaned[good_mask].copy()
+if chunk_size is None:
+    df = pd.read_excel(raw_path)
+    num_duplicates = 0
+else:
+    df, num_duplicates = drop_duplicate_rows_chunked(
+        iter_excel_chunks(raw_path, chunk_size), exclude=["CALVALUS_ID"]
+    )
+    print(f"Removed {num_duplicates} duplicate rows while reading in chunks.")
+
+# === 2. Sentinel-3 flags to mask (see flag_mask.DEFAULT_MASK_PATTERNS) ===
+mask_patterns = DEFAULT_MASK_PATTERNS
+
+# Optional L2 product to read flag_meanings / flag_masks from. When set and the
+# extraction has the raw integer flag bands, those words are tested directly;
+# otherwise the expanded "band.flag" columns are packed into words.
+flag_product = None
+coding = flag_coding_from_netcdf(flag_product) if flag_product else None
+
+# === 3. Dedup (excluding CALVALUS_ID), flag masking and 3x3 box stats in one pass ===
+n_raw = len(df) + num_duplicates
+df_flagged_clean, aggregated, info = clean_and_aggregate(df, mask_patterns, coding)
+del df
+
+# chunked read: the duplicates are already gone, the count comes from the read
+n_duplicates = num_duplicates + info["n_duplicates"]
+dup_groups = info["duplicate_groups"]
+if chunk_size is None:
+    print(f"Found {n_duplicates} duplicate rows (excluding CALVALUS_ID) in {len(dup_groups)} groups.")
+    if len(dup_groups):
+        print(dup_groups.sort_values("n_rows", ascending=False).head(10).to_string(index=False))
+print(f"After removing duplicates: {n_raw - n_duplicates} rows remain.")
+
+bitmasks, coding = info["bitmasks"], info["coding"]
+print(f"Applying mask using {len(masked_flag_names(bitmasks, coding))} flags in {len(bitmasks)} flag bands.")
 print(f"After applying flags: {len(df_flagged_clean)} valid rows remain.")
 
-# === 7. Save final cleaned dataset ===
-output_path = (
-    "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/Sentinel3_pixel_clean_correlation.xlsx"
-)
-df_flagged_clean.to_excel(output_path, index=False)
-print(f"Cleaned file saved as '{output_path}'")
+n_params = len([c for c in param_cols if c in df_flagged_clean.columns])
+print(f"Aggregated {len(aggregated)} 3×3 boxes with n_pixels ({n_params} parameters, mean/std for each).")
+
+# === 4. Save per-pixel ("correlation") and 3x3 box ("clean") tables ===
+# typed Parquet (float32 parameters, categorical Name/ID) for load_satellite()
+for kind, table in [("correlation", df_flagged_clean), ("clean", aggregated)]:
+    if write_excel:
+        table.to_excel(satellite_xlsx[kind], index=False)
+        print(f"Saved '{satellite_xlsx[kind]}'")
+        write_satellite_parquet(table, kind=kind)
+    else:
+        write_satellite_parquet(table, kind=kind, source=raw_path)
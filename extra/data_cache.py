@@ -0,0 +1,241 @@
+import os
+import json
+import hashlib
+import pandas as pd
+import pyarrow.parquet as pq
+
+data_folder = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data"
+cache_folder = os.path.join(data_folder, "cache")
+
+insitu_xlsx = os.path.join(data_folder, "MS_In_situ_Vannmiljo_lakes_coastals.xlsx")
+insitu_parquet = os.path.join(cache_folder, "MS_In_situ_Vannmiljo_lakes_coastals.parquet")
+
+# outputs of clean_satellite.py: 3x3 boxes ("clean") and per-pixel ("correlation")
+satellite_xlsx = {
+    "clean": os.path.join(data_folder, "Sentinel3_pixel_clean.xlsx"),
+    "correlation": os.path.join(data_folder, "Sentinel3_pixel_clean_correlation.xlsx"),
+}
+satellite_parquet = {
+    "clean": os.path.join(cache_folder, "Sentinel3_pixel_clean.parquet"),
+    "correlation": os.path.join(cache_folder, "Sentinel3_pixel_clean_correlation.parquet"),
+}
+
+# identifier / coordinate columns of the Calvalus extractions (never down-cast)
+SATELLITE_CATEGORICAL = ["Name", "ID", "ID_full", "source_name"]
+SATELLITE_FLOAT64 = ["Lat", "Lon", "pixel_lat", "pixel_lon", "pixel_x", "pixel_y"]
+
+# canonical names used by all the plotting / model scripts
+INSITU_RENAME = {
+    "Prøvetakingstidspunkt": "date",
+    "s": "Station",
+}
+
+
+def file_hash(file, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(file, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _signature_path(cache_file):
+    return cache_file + ".json"
+
+
+# True when cache_file was built from the current version of source_file
+def cache_is_fresh(source_file, cache_file):
+    sig_file = _signature_path(cache_file)
+    if not (os.path.exists(cache_file) and os.path.exists(sig_file)):
+        return False
+
+    with open(sig_file, "r", encoding="utf-8") as fh:
+        sig = json.load(fh)
+
+    st = os.stat(source_file)
+    if sig.get("size") == st.st_size and sig.get("mtime") == st.st_mtime:
+        return True
+
+    # touched (e.g. re-synced from OneDrive) but identical content
+    if sig.get("size") == st.st_size and sig.get("sha1") == file_hash(source_file):
+        sig["mtime"] = st.st_mtime
+        with open(sig_file, "w", encoding="utf-8") as fh:
+            json.dump(sig, fh, indent=1)
+        return True
+
+    return False
+
+
+# source file a cache was built from (None when unsigned)
+def cache_source(cache_file):
+    sig_file = _signature_path(cache_file)
+    if not os.path.exists(sig_file):
+        return None
+    with open(sig_file, "r", encoding="utf-8") as fh:
+        return json.load(fh).get("source")
+
+
+def write_cache(df, source_file, cache_file):
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    df.to_parquet(cache_file, index=False)
+    write_signature(source_file, cache_file)
+
+
+def write_signature(source_file, cache_file):
+    st = os.stat(source_file)
+    sig = {
+        "source": os.path.abspath(source_file),
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "sha1": file_hash(source_file),
+    }
+    with open(_signature_path(cache_file), "w", encoding="utf-8") as fh:
+        json.dump(sig, fh, indent=1)
+
+
+# object columns from Excel can hold mixed types -> numbers where possible, text otherwise
+def _type_columns(df):
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        converted = pd.to_numeric(df[col], errors="coerce")
+        if converted.notna().sum() == df[col].notna().sum():
+            df[col] = converted
+        else:
+            df[col] = df[col].astype("string")
+    return df
+
+
+# ==============================
+# IN-SITU (Vannmiljø)
+# ==============================
+
+def build_insitu_cache(xlsx=insitu_xlsx, cache_file=insitu_parquet):
+    df = pd.read_excel(xlsx)
+    df = df.rename(columns=INSITU_RENAME)
+    df.columns = df.columns.astype(str).str.strip()
+
+    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+    df["Station"] = df["Station"].astype("string")
+    df = _type_columns(df)
+
+    # sorted so the Station / date row-group statistics prune well
+    df = df.sort_values(["Station", "date"], kind="stable").reset_index(drop=True)
+
+    write_cache(df, xlsx, cache_file)
+    print(f"Converted {os.path.basename(xlsx)} -> {cache_file} ({len(df)} rows)")
+    return df
+
+
+def load_insitu(stations=None, depth=None, columns=None, xlsx=insitu_xlsx, cache_file=insitu_parquet):
+    """
+    In-situ Vannmiljø data with canonical column names (date, Station).
+
+    stations : station name or list of names (None = all)
+    depth    : (min, max) range on "Nedre dyp" in m, e.g. (0, 5) (None = no filter)
+    columns  : subset of columns to read (date and Station are always included)
+    """
+
+    if not cache_is_fresh(xlsx, cache_file):
+        build_insitu_cache(xlsx, cache_file)
+
+    filters = []
+    if stations is not None:
+        if isinstance(stations, str):
+            stations = [stations]
+        filters.append(("Station", "in", list(stations)))
+    if depth is not None:
+        filters.append(("Nedre dyp", ">=", depth[0]))
+        filters.append(("Nedre dyp", "<=", depth[1]))
+
+    if columns is not None:
+        columns = list(dict.fromkeys(["date", "Station"] + list(columns)))
+
+    return pd.read_parquet(cache_file, columns=columns, filters=filters or None)
+
+
+# ==============================
+# SENTINEL-3 MATCH-UPS
+# ==============================
+
+# float32 parameters, parsed pixel_time, categorical station identifiers
+def type_satellite(df):
+    df = df.copy()
+    df.columns = df.columns.astype(str).str.strip()
+
+    if "pixel_time" in df.columns:
+        df["pixel_time"] = pd.to_datetime(df["pixel_time"], errors="coerce")
+        if getattr(df["pixel_time"].dt, "tz", None) is not None:
+            df["pixel_time"] = df["pixel_time"].dt.tz_localize(None)
+
+    for col in SATELLITE_CATEGORICAL:
+        if col in df.columns:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str)).astype("category")
+
+    for col in df.columns:
+        if col in SATELLITE_FLOAT64 or col in SATELLITE_CATEGORICAL:
+            continue
+        if pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype("float32")
+
+    return df
+
+
+# source: file the table was derived from (the Excel output, or the raw extraction
+# when no Excel copy is written)
+def write_satellite_parquet(df, kind="clean", source=None):
+    write_cache(type_satellite(df), source or satellite_xlsx[kind], satellite_parquet[kind])
+    print(f"Saved Parquet copy: {satellite_parquet[kind]}")
+
+
+# path of an up-to-date Parquet copy of the match-up table
+def satellite_cache(kind="clean"):
+    xlsx = satellite_xlsx[kind]
+    cache_file = satellite_parquet[kind]
+
+    # Parquet signed with the raw extraction (no Excel copy written) is used as is
+    source = cache_source(cache_file)
+    from_excel = source is None or source == os.path.abspath(xlsx)
+
+    if from_excel and not cache_is_fresh(xlsx, cache_file):
+        print(f"Parquet copy of {os.path.basename(xlsx)} missing or outdated, converting.")
+        write_cache(type_satellite(pd.read_excel(xlsx)), xlsx, cache_file)
+
+    return cache_file
+
+
+def satellite_columns(kind="clean"):
+    return pq.read_schema(satellite_cache(kind)).names
+
+
+def load_satellite(columns=None, stations=None, kind="clean"):
+    """
+    Sentinel-3 match-up table from the Parquet copy of the Excel output.
+
+    columns  : only these columns are read (pixel_time and Name are always included)
+    stations : station Name or list of Names (None = all)
+    kind     : "clean" (3x3 box mean/std/n_pixels) or "correlation" (per-pixel),
+               both from clean_satellite.py / stream_clean.py
+    """
+
+    cache_file = satellite_cache(kind)
+
+    if columns is not None:
+        columns = list(dict.fromkeys(["pixel_time", "Name"] + list(columns)))
+        available = pq.read_schema(cache_file).names
+        missing = [c for c in columns if c not in available]
+        if missing:
+            raise KeyError(f"Columns {missing} not found in {os.path.basename(cache_file)}. Available columns: {available}")
+
+    df = pd.read_parquet(cache_file, columns=columns)
+
+    for col in SATELLITE_CATEGORICAL:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+
+    if stations is not None:
+        if isinstance(stations, str):
+            stations = [stations]
+        df = df[df["Name"].isin(stations)].reset_index(drop=True)
+
+    return df
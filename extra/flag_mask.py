@@ -0,0 +1,206 @@
+import re
+import numpy as np
+
+# Sentinel-3 OLCI / C2RCC / IdePix flags that make a pixel invalid
+# (band.flag_meaning, "*" is a wildcard, matched with re.search like before)
+DEFAULT_MASK_PATTERNS = [
+    "quality_flags.invalid",
+    "quality_flags.cosmetic",
+    "quality_flags.duplicated",
+    "quality_flags.sun_glint_risk",
+    "quality_flags.straylight_risk",
+    "quality_flags.saturated_",
+    "pixel_classif_flags.IDEPIX_INVALID",
+    "pixel_classif_flags.IDEPIX_CLOUD",
+    "pixel_classif_flags.IDEPIX_CLOUD_SHADOW",
+    "pixel_classif_flags.IDEPIX_SNOW_ICE",
+    "pixel_classif_flags.IDEPIX_MOUNTAIN_SHADOW",
+    "c2rcc_flags.Rtosa_OOS",
+    "c2rcc_flags.Rhow_OOS",
+    "c2rcc_flags.Iop_OOR",
+    "c2rcc_flags.Rhow_OOR",
+    "c2rcc_flags.*_at_max",
+    "c2rcc_flags.*_at_min",
+    "c2rcc_flags.Cloud_risk",
+    "mph_chl_flags.mph_adjacency",
+]
+
+FLAG_BANDS = ["quality_flags", "pixel_classif_flags", "c2rcc_flags", "mph_chl_flags"]
+
+
+# ==============================
+# FLAG CODING  {band: {meaning: bit mask}}
+# ==============================
+
+# flag_meanings / flag_masks attributes of the flag bands in an L2 product
+def flag_coding_from_netcdf(path, bands=FLAG_BANDS):
+    from netCDF4 import Dataset
+
+    coding = {}
+    with Dataset(path) as ds:
+        for band in bands:
+            if band not in ds.variables:
+                continue
+            var = ds.variables[band]
+            if not hasattr(var, "flag_meanings") or not hasattr(var, "flag_masks"):
+                continue
+            meanings = str(var.flag_meanings).split()
+            masks = np.atleast_1d(var.flag_masks).astype(np.uint64)
+            coding[band] = {m: int(v) for m, v in zip(meanings, masks)}
+    return coding
+
+
+# expanded "band.meaning" columns of a pixel extraction -> one bit per column
+def flag_coding_from_columns(columns, bands=FLAG_BANDS):
+    coding = {}
+    for col in columns:
+        band, _, meaning = str(col).partition(".")
+        if band not in bands or not meaning:
+            continue
+        flags = coding.setdefault(band, {})
+        if len(flags) >= 64:
+            raise ValueError(f"More than 64 expanded flag columns for {band}")
+        flags[meaning] = 1 << len(flags)
+    return coding
+
+
+# one bitmask per flag band from the mask patterns
+def compile_bitmasks(patterns, coding):
+    regexes = [re.compile(p.replace("*", ".*")) for p in patterns]
+
+    bitmasks = {}
+    for band, flags in coding.items():
+        mask = 0
+        for meaning, bit in flags.items():
+            if any(r.search(f"{band}.{meaning}") for r in regexes):
+                mask |= bit
+        if mask:
+            bitmasks[band] = mask
+    return bitmasks
+
+
+# names of the flags selected by the bitmasks (for logging)
+def masked_flag_names(bitmasks, coding):
+    return [
+        f"{band}.{meaning}"
+        for band, mask in bitmasks.items()
+        for meaning, bit in coding[band].items()
+        if mask & bit
+    ]
+
+
+# ==============================
+# EVALUATION
+# ==============================
+
+# words: {band: integer flag array}; True where none of the masked bits is set
+def valid_pixels(words, bitmasks):
+    valid = None
+    for band, mask in bitmasks.items():
+        if band not in words:
+            continue
+        w = np.asarray(words[band])
+        bad = (w.astype(np.uint64, copy=False) & np.uint64(mask)) != 0
+        valid = ~bad if valid is None else valid & ~bad
+    return valid
+
+
+# pack expanded boolean "band.meaning" columns into one integer word per band
+def pack_flag_words(df, coding):
+    words = {}
+    for band, flags in coding.items():
+        word = np.zeros(len(df), dtype=np.uint64)
+        for meaning, bit in flags.items():
+            col = f"{band}.{meaning}"
+            if col not in df.columns:
+                continue
+            is_set = df[col].fillna(0).to_numpy().astype(bool)
+            word[is_set] |= np.uint64(bit)
+        words[band] = word
+    return words
+
+
+def valid_mask_for_frame(df, patterns=DEFAULT_MASK_PATTERNS, coding=None):
+    """
+    Boolean validity mask for a pixel-extraction table.
+
+    Bands with raw integer flag words in the table and a coding from the
+    product metadata (flag_coding_from_netcdf) are tested bit-wise directly;
+    the expanded "band.flag" columns of all other bands are packed into words
+    first. Returns (mask, bitmasks, coding) with the coding of both kinds.
+    """
+
+    raw_bands = [b for b in (coding or {}) if b in df.columns and np.issubdtype(df[b].dtype, np.integer)]
+
+    words = {b: df[b].to_numpy() for b in raw_bands}
+    expanded = {b: flags for b, flags in flag_coding_from_columns(df.columns).items() if b not in raw_bands}
+    words.update(pack_flag_words(df, expanded))
+    coding = {**{b: coding[b] for b in raw_bands}, **expanded}
+
+    bitmasks = compile_bitmasks(patterns, coding)
+    valid = valid_pixels(words, bitmasks)
+    if valid is None:
+        valid = np.ones(len(df), dtype=bool)
+    return valid, bitmasks, coding
+
+
+# AND of finite-data masks for several 2D fields (+ optional flag words)
+def combined_valid_mask(arrays, words=None, bitmasks=None):
+    valid = None
+    for arr in arrays:
+        ok = np.isfinite(arr)
+        valid = ok if valid is None else valid & ok
+    if words is not None and bitmasks:
+        flags_ok = valid_pixels(words, bitmasks)
+        if flags_ok is not None:
+            valid = flags_ok if valid is None else valid & flags_ok
+    return valid
+
+
+# ==============================
+# L3 BINNING maskExpr
+# ==============================
+
+_MASK_TERM = re.compile(r"(\w+)\.(\w+)\s*==\s*([01])")
+
+
+# {"band.flag": 0 or 1} for every flag test in a SNAP maskExpr
+def parse_mask_expr(expr):
+    return {f"{b}.{m}": int(v) for b, m, v in _MASK_TERM.findall(expr)}
+
+
+def compare_mask_expr(expr, patterns=DEFAULT_MASK_PATTERNS, coding=None):
+    """
+    Compare an L3 binning maskExpr with the flag patterns used to clean the
+    pixel extractions. Returns (only_in_patterns, only_in_expr).
+
+    Without a product coding the flags are the names in the patterns plus
+    those in the expression; a wildcard / prefix pattern that matches none of
+    the expression's flags is reported as the pattern itself. Returns None
+    (comparison skipped) when no coding can be built from those names.
+    """
+
+    required_zero = {k for k, v in parse_mask_expr(expr).items() if v == 0}
+
+    unnamed = []
+    if coding is None:
+        # no product at hand -> a coding from the flag names in the expression and the patterns
+        names = set(required_zero)
+        for p in patterns:
+            # "*" / trailing "_" patterns stand for several flags, the others are flag names
+            if "*" not in p and not p.endswith("_"):
+                names.add(p)
+            elif not any(re.search(p.replace("*", ".*"), name) for name in required_zero):
+                unnamed.append(p)
+        try:
+            coding = flag_coding_from_columns(names)
+        except ValueError as err:
+            print(f"maskExpr comparison skipped: {err}")
+            return None
+
+    masked = set(masked_flag_names(compile_bitmasks(patterns, coding), coding))
+    return sorted(masked - required_zero) + unnamed, sorted(required_zero - masked)
+
+
+def snap_mask_expr(bitmasks, coding):
+    return " and ".join(f"{name}==0" for name in masked_flag_names(bitmasks, coding))
@@ -0,0 +1,208 @@
+import os
+import re
+import numpy as np
+
+# Lightweight core shared by the L3 map / zone scripts: the parameter registry
+# and the NetCDF readers. Only numpy is imported here; netCDF4 is imported when
+# a file is read, and the plotting / geo stacks live in the rendering functions
+# of the scripts, so table-only runs start fast.
+
+data_folder = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data"
+l3_folder = os.path.join(data_folder, "L3_daily")
+zones_path = os.path.join(data_folder, "shapefile_zones", "zones_sognefjorden.shp")
+plots_folder = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/plots"
+
+# label, units and colour scales of the L3 daily variables
+PARAM_INFO = {
+    "conc_chl_mean": {
+        "label": "Chlorophyll-a concentration",
+        "units": "mg m$^{-3}$",
+        "vmin_mean": 0,
+        "vmax_mean": 7,
+        "vmin_std": 0,
+        "vmax_std": 14,
+        "cmap_mean": "viridis",
+        "cmap_std": "magma",
+    },
+    "iop_adg_mean": {
+        "label": "CDOM + detritus absorption (a$_{dg}$)",
+        "units": "m$^{-1}$",
+        "vmin_mean": 0,
+        "vmax_mean": 2,
+        "vmin_std": 0,
+        "vmax_std": 7,
+        "cmap_mean": "viridis",
+        "cmap_std": "magma",
+    },
+    "kd489_mean": {
+        "label": "Diffuse attenuation coefficient Kd(489)",
+        "units": "m$^{-1}$",
+        "vmin_mean": 0,
+        "vmax_mean": 2,
+        "vmin_std": 0,
+        "vmax_std": 7,
+        "cmap_mean": "viridis",
+        "cmap_std": "magma",
+    },
+    "c2rcc_secchi_depth_3_mean": {
+        "label": "Secchi depth",
+        "units": "m",
+        "vmin_mean": 0,
+        "vmax_mean": 20,
+        "vmin_std": 0,
+        "vmax_std": 20,
+        "cmap_mean": "viridis",
+        "cmap_std": "magma",
+    },
+    "spm_nechad_665_mean": {
+        "label": "SPM (Nechad 665)",
+        "units": "g m$^{-3}$",
+        "vmin_mean": 0,
+        "vmax_mean": 2,
+        "vmin_std": 0,
+        "vmax_std": 2,
+        "cmap_mean": "viridis",
+        "cmap_std": "magma",
+    },
+    "spm_nechad_865_mean": {
+        "label": "SPM (Nechad 865)",
+        "units": "g m$^{-3}$",
+        "vmin_mean": 0,
+        "vmax_mean": 2,
+        "vmin_std": 0,
+        "vmax_std": 5,
+        "cmap_mean": "viridis",
+        "cmap_std": "magma",
+    },
+    "tur_nechad_665_mean": {
+        "label": "Turbidity (Nechad 665)",
+        "units": "FNU",
+        "vmin_mean": 0,
+        "vmax_mean": 2,
+        "vmin_std": 0,
+        "vmax_std": 2,
+        "cmap_mean": "viridis",
+        "cmap_std": "magma",
+    },
+    "tur_nechad_865_mean": {
+        "label": "Turbidity (Nechad 865)",
+        "units": "FNU",
+        "vmin_mean": 0,
+        "vmax_mean": 2,
+        "vmin_std": 0,
+        "vmax_std": 5,
+        "cmap_mean": "viridis",
+        "cmap_std": "magma",
+    },
+    "chl_c2rcc_mean": {
+        "label": "Chlorophyll-a (C2RCC)",
+        "units": "mg m$^{-3}$",
+        "vmin_mean": 0,
+        "vmax_mean": 2,
+        "vmin_std": 0,
+        "vmax_std": 2,
+        "cmap_mean": "viridis",
+        "cmap_std": "magma",
+    },
+}
+
+
+def param_meta(param_name):
+    try:
+        return PARAM_INFO[param_name]
+    except KeyError:
+        raise KeyError(f"Unknown L3 parameter {param_name!r}, expected one of {list(PARAM_INFO)}") from None
+
+
+def l3_files(folder=l3_folder):
+    paths = []
+    for root, _, files in os.walk(folder):
+        for f in sorted(files):
+            if f.endswith(".nc"):
+                paths.append(os.path.join(root, f))
+    return paths
+
+
+# date (YYYYMMDD) in the file name as datetime64[D], None when there is none
+def scene_date(path):
+    match = re.search(r"(\d{8})", os.path.basename(path))
+    if match is None:
+        return None
+    s = match.group(1)
+    try:
+        return np.datetime64(f"{s[:4]}-{s[4:6]}-{s[6:]}", "D")
+    except ValueError:
+        return None
+
+
+def read_l3_param(param_name, paths=None, folder=l3_folder, require_date=False):
+    """
+    Every 2-D field of one variable in the L3 files (3-D variables give one
+    field per time step), masked cells as NaN. Files that fail to open are
+    reported and skipped; with require_date=True files without a date in the
+    name are skipped too. Returns (lat, lon, dates, stack) with stack of shape
+    (n_fields, n_lat, n_lon), or None when no file has the variable.
+    """
+
+    from netCDF4 import Dataset
+
+    fields, dates = [], []
+    lat, lon = None, None
+
+    for fpath in (l3_files(folder) if paths is None else paths):
+        date = scene_date(fpath)
+        if require_date and date is None:
+            continue
+
+        try:
+            with Dataset(fpath, mode="r") as ds:
+                if param_name not in ds.variables:
+                    continue
+
+                arr = np.ma.masked_invalid(ds.variables[param_name][:]).astype(float).filled(np.nan)
+
+                if lat is None and "lat" in ds.variables and "lon" in ds.variables:
+                    lat = np.asarray(ds.variables["lat"][:])
+                    lon = np.asarray(ds.variables["lon"][:])
+
+        except Exception as e:
+            print(f"Skipped {fpath}: {e}")
+            continue
+
+        for field in (arr if arr.ndim == 3 else [arr]):
+            fields.append(field)
+            dates.append(date)
+
+    if not fields:
+        return None
+    return lat, lon, np.array(dates, dtype="datetime64[D]"), np.stack(fields)
+
+
+# ==============================
+# ZONES
+# ==============================
+
+# flat pixel indices of every zone polygon on the lat/lon grid
+def zone_indices(zones_gdf, lat, lon):
+    from shapely import contains_xy
+
+    lon2d, lat2d = np.meshgrid(lon, lat)
+    indices = {}
+    for i, zone in zones_gdf.iterrows():
+        if zone.geometry is None or zone.geometry.is_empty:
+            continue
+        name = zone.get("zone_name", f"Zone_{i+1}")
+        idx = np.flatnonzero(contains_xy(zone.geometry, lon2d.ravel(), lat2d.ravel()))
+        if len(idx):
+            indices[name] = idx
+    return indices
+
+
+def read_zones(path=zones_path):
+    import geopandas as gpd
+
+    zones_gdf = gpd.read_file(path)
+    zones_gdf = zones_gdf[~zones_gdf.geometry.isnull()].reset_index(drop=True)
+    if zones_gdf.crs is None or zones_gdf.crs.to_epsg() != 4326:
+        zones_gdf = zones_gdf.to_crs(epsg=4326)
+    return zones_gdf
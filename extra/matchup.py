@@ -0,0 +1,102 @@
+import pandas as pd
+
+PERIODS = {"day": "D", "month": "M"}
+
+
+# long table Station / time / parameter / value ({parameter name: source column})
+def _long(df, time_col, station_col, columns):
+    wide = pd.DataFrame({name: df[col] for name, col in columns.items() if col in df.columns})
+    wide["Station"] = df[station_col].astype(str).to_numpy()
+    wide["time"] = pd.to_datetime(df[time_col]).to_numpy()
+
+    long = wide.melt(id_vars=["Station", "time"], var_name="parameter", value_name="value")
+    long["time"] = pd.to_datetime(long["time"])
+    if long["time"].dt.tz is not None:
+        long["time"] = long["time"].dt.tz_localize(None)
+    return long.dropna(subset=["value", "time"])
+
+
+# {in-situ: satellite column or list of columns} -> one row per pair
+def _param_pairs(params):
+    rows = []
+    for name, sat_cols in params.items():
+        if isinstance(sat_cols, str):
+            sat_cols = [sat_cols]
+        rows += [(name, col) for col in sat_cols]
+    return pd.DataFrame(rows, columns=["parameter", "satellite_parameter"])
+
+
+def _period_means(long, freq, keys):
+    long = long.assign(period=long["time"].dt.to_period(freq).dt.start_time)
+    return (
+        long.groupby(["Station", keys, "period"], sort=False)["value"]
+        .agg(["mean", "size"])
+        .reset_index()
+    )
+
+
+def matchups(insitu, satellite, params, how="month", tolerance_hours=3,
+             insitu_time="date", satellite_time="pixel_time",
+             insitu_station="Station", satellite_station="Name"):
+    """
+    In-situ vs satellite pairs for all stations and parameters in one pass.
+
+    params : {in-situ column: satellite column or list of columns},
+             e.g. {"KLFA": ["chl_c2rcc", "chl_oc4"], "TSM": "conc_tsm"}
+    how    : "month"   -> monthly means per station that both tables have
+             "day"     -> daily means (same-day match-ups)
+             "nearest" -> each in-situ sample with the closest satellite pixel
+                          within tolerance_hours (merge_asof)
+
+    Returns a tidy table: Station, parameter, satellite_parameter, period or time
+    columns, insitu, satellite (+ n_insitu / n_satellite for the period modes,
+    dt_hours for "nearest").
+    """
+
+    pairs_map = _param_pairs(params)
+    sat_cols = pairs_map["satellite_parameter"].unique()
+
+    ins = _long(insitu, insitu_time, insitu_station, {p: p for p in params})
+    sat = _long(satellite, satellite_time, satellite_station, {c: c for c in sat_cols})
+    sat = sat.rename(columns={"parameter": "satellite_parameter"})
+
+    if how in PERIODS:
+        freq = PERIODS[how]
+        ins_means = _period_means(ins, freq, "parameter").merge(pairs_map, on="parameter")
+        sat_means = _period_means(sat, freq, "satellite_parameter")
+        pairs = pd.merge(
+            ins_means,
+            sat_means,
+            on=["Station", "satellite_parameter", "period"],
+            how="inner",
+            suffixes=("_insitu", "_satellite"),
+        )
+        pairs = pairs.rename(columns={
+            "mean_insitu": "insitu",
+            "mean_satellite": "satellite",
+            "size_insitu": "n_insitu",
+            "size_satellite": "n_satellite",
+        })
+        pairs = pairs[["Station", "parameter", "satellite_parameter", "period",
+                       "insitu", "n_insitu", "satellite", "n_satellite"]]
+        return pairs.sort_values(["parameter", "satellite_parameter", "Station", "period"]).reset_index(drop=True)
+
+    if how == "nearest":
+        by = ["Station", "parameter", "satellite_parameter"]
+        # merge_asof needs both sides sorted on time; the keys are matched with by=
+        pairs = pd.merge_asof(
+            ins.merge(pairs_map, on="parameter").sort_values("time")
+            .rename(columns={"time": "insitu_time", "value": "insitu"}),
+            sat.merge(pairs_map, on="satellite_parameter").sort_values("time")
+            .rename(columns={"time": "satellite_time", "value": "satellite"}),
+            left_on="insitu_time",
+            right_on="satellite_time",
+            by=by,
+            tolerance=pd.Timedelta(hours=tolerance_hours),
+            direction="nearest",
+        )
+        pairs = pairs.dropna(subset=["satellite"])
+        pairs["dt_hours"] = (pairs["satellite_time"] - pairs["insitu_time"]).dt.total_seconds() / 3600
+        return pairs.sort_values(by + ["insitu_time"]).reset_index(drop=True)
+
+    raise ValueError(f"Unknown match-up mode '{how}', use 'month', 'day' or 'nearest'")
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+# hash of a missing value (NaN / None / NaT), so it never collides with "" or 0
+_MISSING = np.uint64(0x7F4A7C159E3779B9)
+
+
+# same value -> same hash, whatever dtype a chunk happened to be read with
+def _hash_column(s):
+    missing = s.isna().to_numpy()
+    if pd.api.types.is_bool_dtype(s) or pd.api.types.is_numeric_dtype(s):
+        s = s.astype("float64")
+    elif pd.api.types.is_datetime64_any_dtype(s):
+        if s.dt.tz is not None:
+            s = s.dt.tz_localize(None)
+        s = pd.Series(s.to_numpy(dtype="datetime64[ns]").view("int64"))
+    else:
+        s = s.astype(str)
+    return np.where(missing, _MISSING, hash_pandas_object(s, index=False).to_numpy())
+
+
+def row_hashes(df, exclude=("CALVALUS_ID",)):
+    """
+    One uint64 hash per row over all columns except `exclude`, combined column by
+    column so no copy of the frame is made.
+    """
+
+    h = np.zeros(len(df), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for col in sorted(c for c in df.columns if c not in exclude):
+            h = (h * _MIX) ^ _hash_column(df[col])
+    return h
+
+
+# rows sharing a hash (kept row first) with their CALVALUS_IDs
+def duplicate_groups(df, hashes, id_col="CALVALUS_ID"):
+    is_dup = pd.Series(hashes).duplicated(keep=False).to_numpy()
+    if not is_dup.any():
+        return pd.DataFrame(columns=["row_hash", "n_rows", "first_row", id_col])
+
+    groups = pd.DataFrame({"row_hash": hashes[is_dup], "row": df.index[is_dup]})
+    if id_col in df.columns:
+        groups[id_col] = df[id_col].to_numpy()[is_dup]
+    else:
+        groups[id_col] = None
+
+    return (
+        groups.groupby("row_hash", sort=False)
+        .agg(n_rows=("row", "size"), first_row=("row", "first"), **{id_col: (id_col, list)})
+        .reset_index()
+    )
+
+
+def drop_duplicate_rows(df, exclude=("CALVALUS_ID",)):
+    """
+    Remove rows that are identical in every column except `exclude`.
+    Returns (deduplicated frame, duplicate groups).
+    """
+
+    hashes = row_hashes(df, exclude)
+    groups = duplicate_groups(df, hashes)
+    keep = ~pd.Series(hashes).duplicated().to_numpy()
+    return df[keep], groups
+
+
+def drop_duplicate_rows_chunked(chunks, exclude=("CALVALUS_ID",)):
+    """
+    Same as drop_duplicate_rows for an iterable of DataFrame chunks. Only the
+    hashes seen so far are kept between chunks.
+    Returns (deduplicated frame, number of rows dropped).
+    """
+
+    seen = set()
+    kept = []
+    n_dropped = 0
+
+    for chunk in chunks:
+        hashes = row_hashes(chunk, exclude)
+        # set lookups: the cost per chunk does not grow with the rows seen before
+        in_seen = np.fromiter((h in seen for h in hashes.tolist()), dtype=bool, count=len(hashes))
+        keep = ~pd.Series(hashes).duplicated().to_numpy() & ~in_seen
+        n_dropped += int((~keep).sum())
+
+        kept.append(chunk[keep])
+        seen.update(hashes[keep].tolist())
+
+    df = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame()
+    return df, n_dropped
+
+
+# read a large sheet in row chunks without loading the workbook into memory
+def iter_excel_chunks(path, chunk_size=100_000, sheet_name=None):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = [str(c) for c in next(rows)]
+
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=header)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=header)
+    finally:
+        wb.close()
@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import subprocess
+import numpy as np
+
+# Start-up cost of the scheduled entry points: every module is imported in a
+# fresh interpreter (the __main__ blocks do not run), best of `repeat` runs,
+# together with the heavy packages that the import pulled in.
+
+repo = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+ENTRY_POINTS = {
+    "l3_params": "extra",
+    "zones": "extra",
+    "data_cache": "extra",
+    "avg_plott": "plots",
+    "season_plot": "plots",
+    "budget_grid": "model",
+    "budget_analytics": "model",
+    "synthetic_factory": "model",
+}
+
+HEAVY = ["xarray", "netCDF4", "geopandas", "shapely", "cartopy", "matplotlib", "scipy", "sklearn", "ternary"]
+
+# the stack every script used to import up front, for comparison
+EAGER_STACK = ["xarray", "netCDF4", "geopandas", "matplotlib.pyplot", "scipy.stats"]
+
+_PROBE = """
+import sys, time, json, importlib
+sys.path[:0] = {paths!r}
+t0 = time.perf_counter()
+for name in {modules!r}:
+    try:
+        importlib.import_module(name)
+    except ImportError as e:
+        print(json.dumps({{"error": str(e)}}))
+        raise SystemExit
+print(json.dumps({{"seconds": time.perf_counter() - t0,
+                  "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def import_time(modules, paths=(), repeat=5):
+    code = _PROBE.format(paths=list(paths), modules=list(modules), heavy=HEAVY)
+    best, heavy = np.inf, []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=repo)
+        lines = out.stdout.strip().splitlines()
+        if not lines:
+            return {"error": out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "no output"}
+        result = json.loads(lines[-1])
+        if "error" in result:
+            return result
+        best = min(best, result["seconds"])
+        heavy = result["heavy"]
+    return {"seconds": best, "heavy": heavy}
+
+
+def benchmark(entry_points=ENTRY_POINTS, repeat=5):
+    paths = [os.path.join(repo, d) for d in ("extra", "model", "plots")]
+
+    baseline = import_time([], paths, repeat)["seconds"]
+    print(f"{'interpreter':<20} {baseline * 1e3:8.1f} ms")
+
+    stack = [m for m in EAGER_STACK if "error" not in import_time([m], paths, 1)]
+    eager = import_time(stack, paths, repeat)
+    print(f"{'eager plot stack':<20} {eager['seconds'] * 1e3:8.1f} ms   ({', '.join(stack)})")
+
+    for module, folder in entry_points.items():
+        res = import_time([module], [os.path.join(repo, folder)] + paths, repeat)
+        if "error" in res:
+            print(f"{module:<20}   skipped ({res['error']})")
+            continue
+        print(f"{module:<20} {res['seconds'] * 1e3:8.1f} ms   heavy: {', '.join(res['heavy']) or '-'}")
+
+
+if __name__ == "__main__":
+    benchmark()
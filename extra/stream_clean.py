@@ -0,0 +1,280 @@
+import os
+import glob
+import warnings
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from flag_mask import DEFAULT_MASK_PATTERNS, valid_mask_for_frame
+from row_dedup import drop_duplicate_rows, iter_excel_chunks
+from data_cache import cache_folder, satellite_parquet, type_satellite, write_signature, SATELLITE_CATEGORICAL
+
+# Raw Calvalus extraction (csv, parquet or xlsx)
+raw_path = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/Sentinel3_pixelextractions_raw.parquet"
+
+param_cols = [
+    "rtoa_4","rtoa_6","rtoa_8","rtoa_17",
+    "rhow_1","rhow_2","rhow_3","rhow_4","rhow_5","rhow_6","rhow_7","rhow_8",
+    "rhow_9","rhow_10","rhow_11","rhow_12","rhow_16","rhow_17","rhow_18","rhow_21",
+    "iop_apig","iop_adet","iop_agelb","iop_bpart","iop_bwit",
+    "iop_adg","iop_atot","iop_btot","kd489","kd_z90max",
+    "conc_tsm","conc_chl",
+    "spm_nechad_665","spm_nechad_865","tur_nechad_665","tur_nechad_865",
+    "chl_oc4","c2rcc_secchi_depth_1","c2rcc_secchi_depth_2",
+    "c2rcc_secchi_depth_3","c2rcc_secchi_depth_4",
+    "chl_c2rcc","chl_merged_pitarch10_50","chl_merged_pitarch15_50",
+    "chl_merged_pci_pitarch10_50","chl_merged_pci_pitarch15_50",
+    "chl_calib_c2rcc","chl"
+]
+
+# one 3x3 box = one match-up of one station in one scene
+group_cols = ["CALVALUS_ID", "ID_full", "Name", "Lat", "Lon", "ID", "source_name", "pixel_time"]
+
+
+# one integer code per combination of the key columns, in sorted key order
+# (rows with a missing key get -1, like groupby(dropna=True) drops them)
+def _group_codes(df, keys):
+    codes = np.zeros(len(df), dtype=np.int64)
+    valid = np.ones(len(df), dtype=bool)
+
+    for key in keys:
+        c, uniques = pd.factorize(df[key], sort=True)
+        valid &= c >= 0
+        # re-factorise after each key so the combined code stays < len(df)
+        codes = pd.factorize(codes * (len(uniques) + 1) + c, sort=True)[0]
+
+    codes[~valid] = -1
+    return codes
+
+
+def aggregate_box(df):
+    """
+    Mean/std of every parameter over the pixels of each 3x3 box, plus n_pixels.
+
+    The group keys are factorised into one integer code and the rows sorted
+    once; count, sum and sum of squares of all parameters then come from one
+    reduceat over the sorted block. Same columns as groupby(group_cols).agg().
+    """
+
+    cols = [c for c in param_cols if c in df.columns]
+    value_cols = ["pixel_lat", "pixel_lon"] + cols
+
+    codes = _group_codes(df, group_cols)
+    rows = np.flatnonzero(codes >= 0)
+    order = rows[np.argsort(codes[rows], kind="stable")]
+    sorted_codes = codes[order]
+
+    if not len(order):
+        stat_cols = [f"{c}_{stat}" for c in cols for stat in ("mean", "std")]
+        return pd.DataFrame(columns=group_cols + ["pixel_lat_mean", "pixel_lon_mean"] + stat_cols + ["n_pixels"])
+
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    out = df[group_cols].iloc[order[starts]].reset_index(drop=True)
+
+    # one row per parameter (sorted by group) so every reduceat runs over contiguous memory
+    x = np.empty((len(value_cols), len(order)))
+    for j, col in enumerate(value_cols):
+        np.take(df[col].to_numpy(dtype="float64"), order, out=x[j])
+    missing = np.isnan(x)
+
+    # shift by a rough column mean so the sum of squares keeps its precision
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        shift = np.nan_to_num(np.nanmean(x[:, :10_000], axis=1))[:, None]
+    x -= shift
+    np.copyto(x, 0.0, where=missing)
+
+    n_pixels = np.diff(np.r_[starts, len(order)])
+    count = n_pixels - np.add.reduceat(missing, starts, axis=1, dtype=np.int32)
+    total = np.add.reduceat(x, starts, axis=1)
+    np.square(x, out=x)
+    total_sq = np.add.reduceat(x, starts, axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count + shift
+        var = (total_sq - total * total / count) / (count - 1)
+    std = np.sqrt(np.clip(var, 0.0, None))
+    std[count < 2] = np.nan
+    mean[count == 0] = np.nan
+
+    stats = {}
+    for j, col in enumerate(value_cols):
+        stats[f"{col}_mean"] = mean[j]
+        if col not in ("pixel_lat", "pixel_lon"):
+            stats[f"{col}_std"] = std[j]
+    stats["n_pixels"] = n_pixels
+
+    return pd.concat([out, pd.DataFrame(stats)], axis=1)
+
+
+def clean_and_aggregate(df, patterns=DEFAULT_MASK_PATTERNS, coding=None):
+    """
+    Dedup (all columns except CALVALUS_ID), flag masking and 3x3 box statistics
+    in one pass over the raw pixel extraction.
+
+    Returns (pixels, boxes, info)
+      pixels : deduplicated pixels without bad flags ("correlation" table)
+      boxes  : aggregate_box() of those pixels ("clean" table)
+      info   : n_duplicates, duplicate_groups, n_flagged, bitmasks, coding
+    """
+
+    df, groups = drop_duplicate_rows(df, exclude=["CALVALUS_ID"])
+    n_duplicates = int(groups["n_rows"].sum() - len(groups)) if len(groups) else 0
+
+    good_mask, bitmasks, coding = valid_mask_for_frame(df, patterns, coding)
+    pixels = df[good_mask]
+
+    info = {
+        "n_duplicates": n_duplicates,
+        "duplicate_groups": groups,
+        "n_flagged": int((~good_mask).sum()),
+        "bitmasks": bitmasks,
+        "coding": coding,
+    }
+    return pixels, aggregate_box(pixels), info
+
+
+# ==============================
+# CHUNKED INPUT
+# ==============================
+
+def iter_raw_chunks(path=raw_path, chunk_size=200_000):
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == ".csv":
+        yield from pd.read_csv(path, chunksize=chunk_size)
+    elif ext == ".parquet":
+        pf = pq.ParquetFile(path)
+        for batch in pf.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif ext in (".xlsx", ".xlsm"):
+        yield from iter_excel_chunks(path, chunk_size)
+    else:
+        raise ValueError(f"Unsupported raw extraction format: {ext}")
+
+
+# append the rows of each chunk to one spill directory per station
+def spill_by_station(chunks, spill_dir):
+    station_dirs = {}
+    n_rows = 0
+
+    for i, chunk in enumerate(chunks):
+        chunk.columns = chunk.columns.astype(str).str.strip()
+
+        for name, part in chunk.groupby("Name", dropna=False, sort=False):
+            key = name if pd.notna(name) else None
+            if key not in station_dirs:
+                station_dirs[key] = os.path.join(spill_dir, f"station_{len(station_dirs):04d}")
+                os.makedirs(station_dirs[key])
+            part.to_parquet(os.path.join(station_dirs[key], f"part_{i:06d}.parquet"), index=False)
+
+        n_rows += len(chunk)
+        print(f"Chunk {i}: {len(chunk)} rows ({n_rows} total, {len(station_dirs)} stations)")
+
+    return station_dirs, n_rows
+
+
+def read_spilled_station(station_dir):
+    files = sorted(glob.glob(os.path.join(station_dir, "part_*.parquet")))
+    return pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+
+
+# ==============================
+# PARQUET OUTPUT
+# ==============================
+
+def _output_table(df, schema=None):
+    df = type_satellite(df)
+    # nullable integers / bools: same Parquet types as write_satellite_parquet(), and a station
+    # with missing values in a column that was int / bool in the first station still fits
+    for col in df.columns:
+        if pd.api.types.is_bool_dtype(df[col]):
+            df[col] = df[col].astype("boolean")
+        elif pd.api.types.is_integer_dtype(df[col]):
+            df[col] = df[col].astype("Int64")
+
+    if schema is not None:
+        # NaN turns such a column into float in pandas -> back to the type fixed by the first station
+        for field in schema:
+            if field.name in df.columns and pd.api.types.is_float_dtype(df[field.name]):
+                if pa.types.is_integer(field.type):
+                    df[field.name] = df[field.name].astype("Int64")
+                elif pa.types.is_boolean(field.type):
+                    df[field.name] = df[field.name].astype("boolean")
+
+    # plain strings in the file, load_satellite() turns them back into categoricals
+    for col in SATELLITE_CATEGORICAL:
+        if col in df.columns:
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+
+    if schema is not None:
+        return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # all-NaN columns in the first station would otherwise fix a null type
+    fields = [pa.field(f.name, pa.float32()) if pa.types.is_null(f.type) else f for f in table.schema]
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+
+def _append(writers, out_file, df):
+    if df.empty:
+        return
+    if out_file not in writers:
+        table = _output_table(df)
+        writers[out_file] = pq.ParquetWriter(out_file + ".tmp", table.schema)
+    else:
+        table = _output_table(df, writers[out_file].schema)
+    writers[out_file].write_table(table)
+
+
+def stream_clean(path=raw_path, chunk_size=200_000, patterns=DEFAULT_MASK_PATTERNS, coding=None,
+                 out_clean=satellite_parquet["clean"], out_correlation=satellite_parquet["correlation"]):
+    """
+    clean_and_aggregate() on a raw extraction read in chunks.
+
+    The rows are spilled to disk per station (duplicates and 3x3 boxes never
+    span two stations), and each station is then cleaned and aggregated on its
+    own and appended to the Parquet outputs:
+      out_correlation : deduplicated pixels without bad flags
+      out_clean       : 3x3 box mean/std/n_pixels of those pixels
+    """
+
+    os.makedirs(cache_folder, exist_ok=True)
+    spill_dir = tempfile.mkdtemp(prefix="spill_", dir=cache_folder)
+    writers = {}
+
+    try:
+        station_dirs, n_rows = spill_by_station(iter_raw_chunks(path, chunk_size), spill_dir)
+
+        n_duplicates = n_flagged = 0
+        for name, station_dir in station_dirs.items():
+            pixels, boxes, info = clean_and_aggregate(read_spilled_station(station_dir), patterns, coding)
+            n_duplicates += info["n_duplicates"]
+            n_flagged += info["n_flagged"]
+
+            _append(writers, out_correlation, pixels)
+            _append(writers, out_clean, boxes)
+
+            shutil.rmtree(station_dir)
+
+        for out_file, writer in writers.items():
+            writer.close()
+            os.replace(out_file + ".tmp", out_file)
+            write_signature(path, out_file)
+    finally:
+        for writer in writers.values():
+            if writer.is_open:
+                writer.close()
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+    print(f"Read {n_rows} rows from {len(station_dirs)} stations: "
+          f"{n_duplicates} duplicates removed, {n_flagged} flagged pixels removed.")
+    print(f"Saved {out_clean}")
+    print(f"Saved {out_correlation}")
+
+
+if __name__ == "__main__":
+    stream_clean()
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import pearsonr
+
+STAT_COLS = ["n", "r", "p_value", "rmse", "bias", "slope_rma", "intercept_rma"]
+
+
+# r, p-value, RMSE, bias (satellite - in-situ) and RMA regression of y on x
+def validation_stats(x, y):
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    stats = dict.fromkeys(STAT_COLS, np.nan)
+    stats["n"] = len(x)
+    if len(x) < 2:
+        return stats
+
+    corr, pval = pearsonr(x, y)
+    stats["r"] = corr
+    stats["p_value"] = pval
+    stats["rmse"] = np.sqrt(np.mean((y - x) ** 2))
+    stats["bias"] = np.mean(y - x)
+
+    # RMA regression
+    stats["slope_rma"] = np.sign(corr) * (np.std(y, ddof=1) / np.std(x, ddof=1))
+    stats["intercept_rma"] = np.mean(y) - stats["slope_rma"] * np.mean(x)
+    return stats
+
+
+BOOT_COLS = ["r", "rmse", "bias", "slope_rma", "intercept_rma"]
+
+
+# (n_boot, n) matrix of how often each sample is drawn in each resample
+def bootstrap_weights(n, n_boot=10_000, seed=0):
+    idx = np.random.default_rng(seed).integers(0, n, size=(n_boot, n))
+    idx += np.arange(n_boot)[:, None] * n
+    return np.bincount(idx.ravel(), minlength=n_boot * n).reshape(n_boot, n).astype(float)
+
+
+def bootstrap_stats(x, y, n_boot=10_000, ci=95, seed=0, weights=None):
+    """
+    Percentile bootstrap CIs of r, RMSE, bias and the RMA slope/intercept.
+
+    All resamples are drawn at once as a count matrix W (bootstrap_weights), so
+    the moments of every resample come from one product W @ [x, y, x², y², xy].
+    Returns {stat_lo, stat_hi}.
+    """
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+
+    out = {f"{c}_{b}": np.nan for c in BOOT_COLS for b in ("lo", "hi")}
+    if n < 3:
+        return out
+
+    w = bootstrap_weights(n, n_boot, seed) if weights is None else weights
+
+    # common shift keeps the second moments precise and leaves r, slope, bias, RMSE unchanged
+    c = (x.mean() + y.mean()) / 2
+    xs = x - c
+    ys = y - c
+    m = w @ np.column_stack([xs, ys, xs * xs, ys * ys, xs * ys]) / n
+    mx, my, mxx, myy, mxy = m.T
+
+    var_x = np.clip(mxx - mx * mx, 0.0, None)
+    var_y = np.clip(myy - my * my, 0.0, None)
+    cov = mxy - mx * my
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r = cov / np.sqrt(var_x * var_y)
+        slope = np.sign(r) * np.sqrt(var_y / var_x)
+
+    boot = {
+        "r": r,
+        "rmse": np.sqrt(np.clip(mxx + myy - 2 * mxy, 0.0, None)),
+        "bias": my - mx,
+        "slope_rma": slope,
+        "intercept_rma": (my + c) - slope * (mx + c),
+    }
+
+    alpha = (100 - ci) / 2
+    for name, values in boot.items():
+        lo, hi = np.nanpercentile(values, [alpha, 100 - alpha])
+        out[f"{name}_lo"] = lo
+        out[f"{name}_hi"] = hi
+    return out
+
+
+def validation_table(pairs, by=("parameter", "satellite_parameter"), n_boot=0, ci=95, seed=0):
+    """
+    Statistics of a matchups() table for every parameter pair, per station and
+    for all stations together (Station = "all").
+
+    n_boot > 0 adds bootstrap CIs (<stat>_lo / <stat>_hi) for r, RMSE, bias and
+    the RMA fit; one resample matrix is drawn per sample size and reused.
+    """
+
+    by = list(by)
+    weights = {}
+
+    def stats(g):
+        row = validation_stats(g["insitu"], g["satellite"])
+        if n_boot:
+            n = len(g)
+            if n >= 3 and n not in weights:
+                weights[n] = bootstrap_weights(n, n_boot, seed)
+            row.update(bootstrap_stats(g["insitu"], g["satellite"], n_boot, ci, seed, weights.get(n)))
+        return row
+
+    rows = []
+    for keys, group in pairs.groupby(by, sort=True):
+        keys = dict(zip(by, keys))
+        rows.append({**keys, "Station": "all", **stats(group)})
+        for station, g in group.groupby("Station", sort=True):
+            rows.append({**keys, "Station": station, **stats(g)})
+
+    columns = by + ["Station"] + STAT_COLS
+    if n_boot:
+        columns += [f"{c}_{b}" for c in BOOT_COLS for b in ("lo", "hi")]
+    return pd.DataFrame(rows, columns=columns)
@@ -0,0 +1,123 @@
+import os
+import itertools
+import numpy as np
+import pandas as pd
+from scipy.optimize import nnls
+from concurrent.futures import ProcessPoolExecutor
+
+ASTAR_NAMES = ["a_star_CDOM", "a_star_PHY", "a_star_NAP"]
+
+# design matrix / targets shared with the worker processes (set once per pool)
+_SHARED = {}
+
+
+def design_matrix(CDOM, CHL, TSM):
+    return np.column_stack([
+        np.asarray(CDOM, dtype=float),
+        np.asarray(CHL, dtype=float),
+        np.asarray(TSM, dtype=float),
+    ])
+
+
+def _init_worker(A, kd, tsm, a_water, bb_water, include_bb):
+    _SHARED.update(A=A, kd=kd, tsm=tsm, a_water=a_water, bb_water=bb_water, include_bb=include_bb)
+
+
+def solve_astar(A, kd, a_water, lam, bb=0.0):
+    """
+    NNLS with Tikhonov rows sqrt(lam) * I for kd - a_water - bb = A @ a*.
+    Returns (a*, kd_predicted).
+    """
+
+    b = kd - a_water - bb
+    A_aug = np.vstack([A, np.sqrt(lam) * np.eye(A.shape[1])])
+    b_aug = np.concatenate([b, np.zeros(A.shape[1])])
+
+    astar, _ = nnls(A_aug, b_aug)
+    return astar, A @ astar + a_water + bb
+
+
+def _fit_errors(kd, kd_pred):
+    resid = kd_pred - kd
+    ss_tot = ((kd - kd.mean()) ** 2).sum()
+    return {
+        "rmse": np.sqrt(np.mean(resid ** 2)),
+        "bias": resid.mean(),
+        "r2": 1 - (resid ** 2).sum() / ss_tot if ss_tot > 0 else np.nan,
+    }
+
+
+def _solve_job(job):
+    lam, alpha, beta, rows = job
+    A, kd, tsm = _SHARED["A"], _SHARED["kd"], _SHARED["tsm"]
+    if rows is not None:
+        A, kd, tsm = A[rows], kd[rows], tsm[rows]
+
+    bb = alpha * tsm ** beta + _SHARED["bb_water"] if _SHARED["include_bb"] else 0.0
+    astar, kd_pred = solve_astar(A, kd, _SHARED["a_water"], lam, bb)
+    return {**dict(zip(ASTAR_NAMES, astar)), **_fit_errors(kd, kd_pred)}
+
+
+def _run_jobs(jobs, shared, n_workers=None):
+    # n_workers=1 runs in-process (handy for debugging in the notebook)
+    if n_workers == 1:
+        _init_worker(*shared)
+        return [_solve_job(job) for job in jobs]
+
+    n_workers = n_workers or os.cpu_count()
+    chunksize = max(1, len(jobs) // (4 * n_workers))
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=shared) as pool:
+        return list(pool.map(_solve_job, jobs, chunksize=chunksize))
+
+
+def sweep_astar(kd, CDOM, CHL, TSM, a_water, lams, alphas=(0.0,), betas=(1.0,),
+                bb_water=0.0, include_bb=True, n_workers=None):
+    """
+    a*_CDOM, a*_PHY and a*_NAP for every lam x alpha x beta on the grid.
+
+    The backscatter bb = alpha * TSM**beta + bb_water is subtracted from Kd
+    when include_bb is True (with include_bb=False alpha/beta have no effect,
+    as in estimate_astar_stable_PAR). Returns one row per grid point with
+    rmse, bias and r2 of the predicted Kd.
+    """
+
+    A = design_matrix(CDOM, CHL, TSM)
+    kd = np.asarray(kd, dtype=float)
+    shared = (A, kd, A[:, 2], a_water, bb_water, include_bb)
+
+    grid = list(itertools.product(lams, alphas, betas))
+    results = _run_jobs([(lam, alpha, beta, None) for lam, alpha, beta in grid], shared, n_workers)
+
+    table = pd.DataFrame(grid, columns=["lam", "alpha", "beta"])
+    return pd.concat([table, pd.DataFrame(results)], axis=1)
+
+
+def sweep_astar_by_station(df, a_water, lams, alphas=(0.0,), betas=(1.0,), bb_water=0.0,
+                           include_bb=True, n_workers=None, kd_col="k_d_insitu",
+                           cdom_col="CDOM_insitu", chl_col="KLFA_insitu", tsm_col="TSM_insitu"):
+    tables = []
+    for station, g in df.dropna(subset=[kd_col, cdom_col, chl_col, tsm_col]).groupby("Station"):
+        table = sweep_astar(g[kd_col], g[cdom_col], g[chl_col], g[tsm_col], a_water,
+                            lams, alphas, betas, bb_water, include_bb, n_workers)
+        table.insert(0, "Station", station)
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
+
+def bootstrap_astar(kd, CDOM, CHL, TSM, a_water, lam, alpha=0.0, beta=1.0, bb_water=0.0,
+                    include_bb=True, n_boot=1000, random_seed=42, n_workers=None):
+    """
+    Bootstrap distribution of a* at one (lam, alpha, beta): all resample index
+    sets are drawn up front and the NNLS problems solved in the process pool.
+    """
+
+    A = design_matrix(CDOM, CHL, TSM)
+    kd = np.asarray(kd, dtype=float)
+    shared = (A, kd, A[:, 2], a_water, bb_water, include_bb)
+
+    rows = np.random.default_rng(random_seed).integers(0, len(kd), size=(n_boot, len(kd)))
+    results = _run_jobs([(lam, alpha, beta, r) for r in rows], shared, n_workers)
+
+    table = pd.DataFrame(results)
+    table.insert(0, "replicate", np.arange(n_boot))
+    return table
@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import math
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extra"))
+from data_cache import cache_folder, cache_is_fresh, write_cache, satellite_cache, load_satellite
+from l3_params import l3_folder, l3_files, scene_date, zones_path, read_zones, zone_indices
+from budget_grid import budget_model, read_l3_inputs, a_water_lam0
+
+plot_output = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/plots/budget_plots"
+
+zone_cache = os.path.join(cache_folder, "budget_zone_days.parquet")
+
+COMPONENTS = ["a_cdom", "a_ph", "a_nap", "bb"]
+FRACTIONS = ["f_cdom", "f_ph", "f_nap"]
+
+# satellite match-up columns used by budget_model1/3.ipynb
+MATCHUP_INPUTS = {
+    "cdom": "iop_agelb_mean",
+    "chl": "chl_c2rcc_mean",
+    "tsm": "spm_nechad_665_mean",
+    "kd": "kd489_mean",
+}
+
+
+# ==============================
+# FRACTION TABLES
+# ==============================
+
+def fraction_table(df, cdom, chl, tsm, kd=None, cdom_is_absorption=False, keep=("date", "Station"),
+                   alpha=0.02, beta=0.9):
+    """
+    Budget model for every row of a station table (in-situ or satellite
+    match-ups): the keep columns plus a_cdom, a_ph, a_nap, bb, f_cdom, f_ph,
+    f_nap, kd_pred and kd_resid (when kd is given). Rows with a missing input
+    are dropped.
+    """
+
+    cols = [c for c in (cdom, chl, tsm, kd) if c is not None]
+    df = df.dropna(subset=cols)
+
+    outputs = COMPONENTS + FRACTIONS + ["kd_pred"] + (["kd_resid"] if kd is not None else [])
+    out = budget_model(df[cdom].to_numpy(float), df[chl].to_numpy(float), df[tsm].to_numpy(float),
+                       None if kd is None else df[kd].to_numpy(float), alpha=alpha, beta=beta,
+                       cdom_is_absorption=cdom_is_absorption, outputs=outputs, dtype=np.float64)
+
+    table = df[[c for c in keep if c in df.columns]].reset_index(drop=True)
+    table = pd.concat([table, pd.DataFrame({name: out[name] for name in outputs})], axis=1)
+    table["alpha"] = alpha
+    table["beta"] = beta
+    return table
+
+
+def matchup_budget(kind="clean", alpha=0.02, beta=0.9, inputs=MATCHUP_INPUTS, refresh=False):
+    """
+    fraction_table of the Sentinel-3 match-up table, cached in Parquet next to
+    the match-up cache and rebuilt when that table or alpha/beta change.
+    """
+
+    source = satellite_cache(kind)
+    cache_file = os.path.join(cache_folder, f"budget_matchups_{kind}.parquet")
+
+    if not refresh and cache_is_fresh(source, cache_file):
+        table = pd.read_parquet(cache_file)
+        if len(table) == 0 or (table["alpha"].iloc[0] == alpha and table["beta"].iloc[0] == beta):
+            return table
+
+    satellite = load_satellite(columns=list(inputs.values()), kind=kind)
+    table = fraction_table(satellite, inputs["cdom"], inputs["chl"], inputs["tsm"], inputs.get("kd"),
+                           cdom_is_absorption=True, keep=("pixel_time", "Name"), alpha=alpha, beta=beta)
+    table = table.rename(columns={"pixel_time": "date", "Name": "Station"})
+    table["Station"] = table["Station"].astype(str)
+    write_cache(table, source, cache_file)
+    return table
+
+
+# ==============================
+# ZONE-DAYS FROM THE L3 SCENES
+# ==============================
+
+def scene_zone_budget(path, zones_gdf, alpha=0.02, beta=0.9, indices=None):
+    """
+    Zone means of the absorption / backscatter components of one L3 scene and
+    the fractions and predicted Kd of those means (so f_cdom + f_ph + f_nap = 1
+    per zone-day); kd_sat and kd_resid are zone medians. Returns (rows, indices)
+    so the zone indices can be reused for the next scene on the same grid.
+    """
+
+    lat, lon, fields = read_l3_inputs(path)
+    if indices is None or indices[0] != (lat.shape, lon.shape):
+        indices = ((lat.shape, lon.shape), zone_indices(zones_gdf, lat, lon))
+
+    maps = budget_model(fields["cdom"], fields["chl"], fields["tsm"], fields["kd"], alpha=alpha, beta=beta,
+                        outputs=COMPONENTS + (["kd_resid"] if fields["kd"] is not None else []))
+    flat = {name: values.reshape(-1) for name, values in maps.items()}
+    kd = None if fields["kd"] is None else fields["kd"].reshape(-1)
+
+    date = pd.Timestamp(scene_date(path))
+    rows = []
+    for zone, idx in indices[1].items():
+        comp = np.stack([flat[name][idx] for name in COMPONENTS]).astype(float)
+        valid = np.isfinite(comp).all(axis=0)
+        n = int(valid.sum())
+        if n == 0:
+            continue
+
+        mean = comp[:, valid].mean(axis=1)
+        row = {"date": date, "zone": zone, "n_pixels": n, **dict(zip(COMPONENTS, mean))}
+        oac = mean[:3].sum()
+        row.update(zip(FRACTIONS, mean[:3] / oac if oac > 0 else [np.nan] * 3))
+        row["kd_pred"] = a_water_lam0 + mean.sum()
+        row["kd_sat"] = np.nanmedian(kd[idx][valid]) if kd is not None else np.nan
+        row["kd_resid"] = np.nanmedian(flat["kd_resid"][idx][valid]) if kd is not None else np.nan
+        rows.append(row)
+
+    return rows, indices
+
+
+def _scene_signature(paths):
+    sig = {}
+    for path in paths:
+        st = os.stat(path)
+        sig[os.path.abspath(path)] = [st.st_size, st.st_mtime]
+    return sig
+
+
+def zone_day_budget(paths=None, zones_file=zones_path, cache_file=zone_cache, alpha=0.02, beta=0.9,
+                    refresh=False):
+    """
+    Zone-day budget table (scene_zone_budget for every L3 scene), cached in
+    Parquet. The cache records size/mtime of every scene, so only new or changed
+    scenes are processed; it is rebuilt when the zones or alpha/beta change.
+    """
+
+    paths = l3_files(l3_folder) if paths is None else paths
+    sig_file = cache_file + ".scenes.json"
+    current = _scene_signature(paths)
+    zones_sig = _scene_signature([zones_file])
+
+    table, done = None, {}
+    if not refresh and os.path.exists(cache_file) and os.path.exists(sig_file):
+        with open(sig_file, "r", encoding="utf-8") as fh:
+            sig = json.load(fh)
+        if sig.get("zones") == zones_sig and sig.get("alpha") == alpha and sig.get("beta") == beta:
+            table = pd.read_parquet(cache_file)
+            done = {p: s for p, s in sig["scenes"].items() if current.get(p) == s}
+            table = table[table["source"].isin(list(done))]
+
+    todo = [p for p in current if p not in done]
+    if not todo and table is not None:
+        return table.drop(columns="source").reset_index(drop=True)
+
+    n_cached = len(done)
+    zones_gdf = read_zones(zones_file)
+    rows, indices = [], None
+    for path in todo:
+        try:
+            scene_rows, indices = scene_zone_budget(path, zones_gdf, alpha, beta, indices)
+        except Exception as e:
+            print(f"Skipped {path}: {e}")
+            continue
+        rows.extend({**row, "source": path} for row in scene_rows)
+        done[path] = current[path]
+    print(f"Budget zone-days: {len(todo)} new/changed scenes, {n_cached} cached")
+
+    new = pd.DataFrame(rows)
+    table = new if table is None else pd.concat([table, new], ignore_index=True)
+    if len(table):
+        table = table.sort_values(["zone", "date"], kind="stable").reset_index(drop=True)
+
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    table.to_parquet(cache_file, index=False)
+    with open(sig_file, "w", encoding="utf-8") as fh:
+        json.dump({"zones": zones_sig, "alpha": alpha, "beta": beta, "scenes": done}, fh, indent=1)
+
+    return table.drop(columns="source", errors="ignore").reset_index(drop=True)
+
+
+# ==============================
+# PLOTS
+# ==============================
+
+def ternary_axes(ax, title, scale=1.0):
+    import ternary
+
+    ax.axis("off")
+    tax = ternary.TernaryAxesSubplot(ax=ax, scale=scale)
+    tax.boundary(linewidth=2.0)
+    tax.gridlines(color="gray", multiple=0.2, linewidth=0.5)
+    tax.set_title(title, fontsize=14)
+    tax.left_axis_label("a.CDOM", fontsize=12, offset=0.14)
+    tax.right_axis_label("a.NAP", fontsize=12, offset=0.14)
+    tax.bottom_axis_label("a.phy", fontsize=12, offset=0.08)
+    tax.ticks(axis="lbr", multiple=0.2, tick_formats="%.1f", fontsize=10, linewidth=1)
+    tax.clear_matplotlib_ticks()
+    tax._redraw_labels()
+    return tax
+
+
+def ternary_scatter(tax, f_cdom, f_ph, f_nap, scale=1.0, **kwargs):
+    """
+    All points (f_cdom, f_nap, f_ph) in one scatter call on a ternary axes.
+    The barycentric -> cartesian projection of python-ternary is done on the
+    arrays; colour by value with c=..., cmap=..., vmin/vmax as in plt.scatter.
+    """
+
+    f_cdom = np.asarray(f_cdom, dtype=float)
+    f_nap = np.asarray(f_nap, dtype=float)
+    x = scale * (f_cdom + f_nap / 2)
+    y = scale * (np.sqrt(3) / 2) * f_nap
+    return tax.get_axes().scatter(x, y, **kwargs)
+
+
+def month_colorbar(artist, ax, ticks=(1, 3, 6, 9, 12)):
+    import matplotlib.pyplot as plt
+
+    cbar = plt.colorbar(artist, ax=ax, orientation="horizontal", fraction=0.05, pad=0.15)
+    cbar.set_label("Month", fontsize=12)
+    cbar.set_ticks(list(ticks))
+    cbar.set_ticklabels([pd.Timestamp(2000, m, 1).strftime("%b") for m in ticks])
+    return cbar
+
+
+def plot_zone_ternary(table, save_path, cmap="viridis", ncols=3):
+    # one ternary panel per zone, zone-days coloured by month
+    import matplotlib.pyplot as plt
+
+    zones = list(dict.fromkeys(table["zone"]))
+    nrows = math.ceil(len(zones) / ncols)
+    fig, axes = plt.subplots(nrows, ncols, figsize=(6 * ncols, 6 * nrows), squeeze=False)
+    axes = axes.flatten()
+
+    for ax, (zone, g) in zip(axes, table.groupby("zone", sort=False)):
+        tax = ternary_axes(ax, f"{zone} (n={len(g)})")
+        sc = ternary_scatter(tax, g["f_cdom"], g["f_ph"], g["f_nap"], s=12, alpha=0.7,
+                             c=pd.to_datetime(g["date"]).dt.month, cmap=cmap, vmin=1, vmax=12)
+        month_colorbar(sc, ax)
+
+    for ax in axes[len(zones):]:
+        ax.axis("off")
+
+    fig.suptitle("Fractional absorption contributions per zone-day (Sentinel-3)", fontsize=16, fontweight="bold")
+    fig.tight_layout(rect=[0, 0, 1, 0.96])
+    fig.savefig(save_path, dpi=300)
+    plt.close(fig)
+
+
+def plot_zone_budget_timeseries(table, save_path, ncols=2):
+    # stacked a_water + a_cdom + a_ph + a_nap + bb = predicted Kd against Kd(489)
+    import matplotlib.pyplot as plt
+    import matplotlib.dates as mdates
+
+    zones = list(dict.fromkeys(table["zone"]))
+    nrows = math.ceil(len(zones) / ncols)
+    fig, axes = plt.subplots(nrows, ncols, figsize=(14, 4 * nrows), sharex=True, squeeze=False)
+    axes = axes.flatten()
+    labels = ["a$_w$", "a$_{CDOM}$", "a$_{phy}$", "a$_{NAP}$", "b$_{b}$"]
+
+    for i, (zone, g) in enumerate(table.groupby("zone", sort=False)):
+        ax = axes[i]
+        g = g.sort_values("date")
+        dates = pd.to_datetime(g["date"]).to_numpy()
+        layers = np.vstack([np.full(len(g), a_water_lam0)] + [g[c].to_numpy(float) for c in COMPONENTS])
+
+        ax.stackplot(dates, layers, labels=labels, alpha=0.8)
+        ax.plot(dates, g["kd_sat"], "k.", markersize=3, label="Kd(489)")
+        ax.set_title(zone)
+        ax.set_ylabel("m$^{-1}$")
+        ax.grid(True, linestyle="--", alpha=0.4)
+        ax.xaxis.set_major_locator(mdates.YearLocator())
+        ax.xaxis.set_major_formatter(mdates.DateFormatter("%Y"))
+        if i == 0:
+            ax.legend(fontsize=8, ncol=3)
+
+    for ax in axes[len(zones):]:
+        ax.axis("off")
+
+    fig.suptitle("Daily Kd budget per zone (Sentinel-3)", fontsize=16, fontweight="bold")
+    fig.autofmt_xdate()
+    fig.tight_layout(rect=[0, 0, 1, 0.96])
+    fig.savefig(save_path, dpi=300)
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    os.makedirs(plot_output, exist_ok=True)
+
+    zone_days = zone_day_budget()
+    print(zone_days.groupby("zone")[FRACTIONS + ["kd_resid"]].median())
+
+    plot_zone_ternary(zone_days, os.path.join(plot_output, "budget_zones_ternary.png"))
+    plot_zone_budget_timeseries(zone_days, os.path.join(plot_output, "budget_zones_timeseries.png"))
+
+    matchups = matchup_budget("clean")
+    fig, ax = plt.subplots(figsize=(7, 7))
+    tax = ternary_axes(ax, "Fractional Absorption Contributions - Satellite match-ups")
+    sc = ternary_scatter(tax, matchups["f_cdom"], matchups["f_ph"], matchups["f_nap"], s=22, alpha=0.85,
+                         c=pd.to_datetime(matchups["date"]).dt.month, cmap="Greens", vmin=1, vmax=12)
+    month_colorbar(sc, ax)
+    fig.savefig(os.path.join(plot_output, "budget_matchups_ternary.png"), dpi=300, bbox_inches="tight")
+    plt.close(fig)
+    print(f"Saved budget plots to {plot_output}")
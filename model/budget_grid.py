@@ -0,0 +1,200 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extra"))
+from l3_params import data_folder, l3_folder, l3_files, scene_date
+
+output_file = os.path.join(data_folder, "model", "budget_L3_daily.nc")
+
+# fixed parameters (443 nm), as in budget_model1.ipynb / model.ipynb
+a_cdom_star = 0.426
+a_ph_star = 0.024
+a_nap_star = 0.105
+a_water_lam0 = 0.0064
+bb_water_lam0 = 0.0035
+
+# L3 variable of each model input
+L3_INPUTS = {
+    "cdom": "iop_adg_mean",        # already an absorption (cdom_is_absorption=True)
+    "chl": "chl_c2rcc_mean",
+    "tsm": "spm_nechad_665_mean",
+    "kd": "kd489_mean",
+}
+
+BUDGET_OUTPUTS = ["a_cdom", "a_ph", "a_nap", "atot", "bb", "f_cdom", "f_ph", "f_nap", "kd_pred", "kd_resid"]
+DEFAULT_OUTPUTS = ("f_cdom", "f_ph", "f_nap", "kd_pred", "kd_resid")
+
+
+def budget_model(cdom, chl, tsm, kd=None, alpha=0.02, beta=0.9, cdom_is_absorption=True,
+                 outputs=DEFAULT_OUTPUTS, chunk_size=1 << 20, dtype=np.float32):
+    """
+    Kd / IOP budget model for every pixel of an L3 grid (lat, lon) or time cube
+    (time, lat, lon).
+
+        a_cdom = a*_CDOM * CDOM   (or the satellite absorption as is)
+        a_ph   = a*_PHY  * CHL
+        a_nap  = a*_NAP  * TSM
+        atot   = a_water + a_cdom + a_ph + a_nap
+        bb     = alpha * TSM**beta + bb_water
+        kd_pred = atot + bb,  kd_resid = kd_pred - kd
+
+    f_cdom / f_ph / f_nap are the shares of a_cdom + a_ph + a_nap. The grid is
+    processed in chunks of chunk_size pixels with in-place ufuncs, so besides
+    the requested outputs only chunk-sized scratch buffers are allocated.
+    NaN inputs give NaN outputs. Returns {name: array shaped like the inputs}.
+    """
+
+    cdom = np.asarray(cdom)
+    shape = cdom.shape
+    flat_in = {"cdom": cdom.reshape(-1), "chl": np.asarray(chl).reshape(-1), "tsm": np.asarray(tsm).reshape(-1)}
+    if kd is not None:
+        flat_in["kd"] = np.asarray(kd).reshape(-1)
+    for name, values in flat_in.items():
+        if values.size != cdom.size:
+            raise ValueError(f"{name} has {values.size} pixels, expected {cdom.size} (shape {shape})")
+
+    unknown = set(outputs) - set(BUDGET_OUTPUTS)
+    if unknown:
+        raise ValueError(f"Unknown outputs: {sorted(unknown)}")
+    if kd is None:
+        outputs = [o for o in outputs if o != "kd_resid"]
+
+    n = cdom.size
+    chunk_size = max(1, min(chunk_size, n))
+    out = {name: np.empty(shape, dtype=dtype) for name in outputs}
+    flat_out = {name: values.reshape(-1) for name, values in out.items()}
+    scratch = {name: np.empty(chunk_size, dtype=dtype) for name in BUDGET_OUTPUTS if name not in out}
+    oac = np.empty(chunk_size, dtype=dtype)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for start in range(0, n, chunk_size):
+            s = slice(start, min(start + chunk_size, n))
+            m = s.stop - s.start
+            buf = {name: flat_out[name][s] if name in flat_out else scratch[name][:m] for name in BUDGET_OUTPUTS}
+            tsm_s = flat_in["tsm"][s]
+            oac_s = oac[:m]
+
+            # absorption of the optically active constituents
+            if cdom_is_absorption:
+                buf["a_cdom"][:] = flat_in["cdom"][s]
+            else:
+                np.multiply(flat_in["cdom"][s], a_cdom_star, out=buf["a_cdom"])
+            np.multiply(flat_in["chl"][s], a_ph_star, out=buf["a_ph"])
+            np.multiply(tsm_s, a_nap_star, out=buf["a_nap"])
+
+            np.add(buf["a_cdom"], buf["a_ph"], out=oac_s)
+            np.add(oac_s, buf["a_nap"], out=oac_s)
+            np.add(oac_s, a_water_lam0, out=buf["atot"])
+
+            # absorption fractions
+            np.divide(buf["a_cdom"], oac_s, out=buf["f_cdom"])
+            np.divide(buf["a_ph"], oac_s, out=buf["f_ph"])
+            np.divide(buf["a_nap"], oac_s, out=buf["f_nap"])
+
+            # backscatter and predicted Kd
+            np.power(tsm_s, beta, out=buf["bb"])
+            np.multiply(buf["bb"], alpha, out=buf["bb"])
+            np.add(buf["bb"], bb_water_lam0, out=buf["bb"])
+            np.add(buf["atot"], buf["bb"], out=buf["kd_pred"])
+
+            if kd is not None:
+                np.subtract(buf["kd_pred"], flat_in["kd"][s], out=buf["kd_resid"])
+
+    return out
+
+
+# first time slice of an L3 variable with the fill values as NaN
+def _read_field(ds, vname, dtype=np.float32):
+    data = ds.variables[vname][:]
+    if data.ndim == 3:
+        data = data[0, :, :]
+    elif data.ndim > 3:
+        raise ValueError(f"Unexpected dimensions for {vname}: {data.shape}")
+    if np.ma.isMaskedArray(data):
+        data = data.astype(dtype).filled(np.nan)
+    return np.asarray(data, dtype=dtype)
+
+
+def read_l3_inputs(path, inputs=L3_INPUTS):
+    """
+    lat, lon and the model inputs of one L3 scene. A missing kd variable gives
+    kd = None (no residual); the other inputs are required.
+    """
+
+    from netCDF4 import Dataset
+
+    with Dataset(path) as ds:
+        lat = ds.variables["lat"][:]
+        lon = ds.variables["lon"][:]
+        fields = {}
+        for key, vname in inputs.items():
+            if vname not in ds.variables:
+                if key == "kd":
+                    fields[key] = None
+                    continue
+                raise KeyError(f"{vname} not found in {path}")
+            fields[key] = _read_field(ds, vname)
+    return np.asarray(lat), np.asarray(lon), fields
+
+
+def budget_scenes(paths, out_path, alpha=0.02, beta=0.9, outputs=DEFAULT_OUTPUTS,
+                  inputs=L3_INPUTS, chunk_size=1 << 20):
+    """
+    Run budget_model on every L3 scene and write the maps to one netCDF with a
+    time dimension (time, lat, lon). Scenes are read, modelled and written one
+    at a time, so the full cube is never held in memory; scenes on a different
+    grid than the first one are skipped. Returns the list of written dates.
+    """
+
+    from netCDF4 import Dataset
+
+    dates = []
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with Dataset(out_path, "w") as out:
+        grid = None
+        for path in paths:
+            try:
+                lat, lon, fields = read_l3_inputs(path, inputs)
+            except Exception as e:
+                print(f"Skipped {path}: {e}")
+                continue
+
+            if grid is None:
+                grid = (lat, lon)
+                out.createDimension("time", None)
+                out.createDimension("lat", len(lat))
+                out.createDimension("lon", len(lon))
+                out.createVariable("lat", "f8", ("lat",))[:] = lat
+                out.createVariable("lon", "f8", ("lon",))[:] = lon
+                t = out.createVariable("time", "f8", ("time",))
+                t.units = "days since 1970-01-01"
+                for name in outputs:
+                    if name == "kd_resid" and fields["kd"] is None:
+                        continue
+                    out.createVariable(name, "f4", ("time", "lat", "lon"), zlib=True, fill_value=np.nan)
+                out.alpha = alpha
+                out.beta = beta
+            elif lat.shape != grid[0].shape or lon.shape != grid[1].shape:
+                print(f"Skipped {path}: grid {lat.shape + lon.shape} differs from {grid[0].shape + grid[1].shape}")
+                continue
+
+            maps = budget_model(fields["cdom"], fields["chl"], fields["tsm"], fields["kd"],
+                                alpha=alpha, beta=beta, outputs=outputs, chunk_size=chunk_size)
+
+            i = len(dates)
+            date = pd.Timestamp(scene_date(path))
+            out.variables["time"][i] = (date - pd.Timestamp("1970-01-01")) / pd.Timedelta(days=1) if pd.notna(date) else np.nan
+            for name, values in maps.items():
+                if name in out.variables:
+                    out.variables[name][i, :, :] = values
+            dates.append(date)
+            print(f"{os.path.basename(path)}: budget maps written")
+
+    return dates
+
+
+if __name__ == "__main__":
+    dates = budget_scenes(l3_files(l3_folder), output_file)
+    print(f"\n Saved {len(dates)} scenes to '{output_file}'")
@@ -0,0 +1,142 @@
+import os
+import io
+import re
+import sys
+import json
+import hashlib
+import warnings
+import contextlib
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.experimental import enable_iterative_imputer  # noqa: F401
+from sklearn.impute import IterativeImputer
+from sklearn.linear_model import BayesianRidge
+from sklearn.exceptions import ConvergenceWarning
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extra"))
+from data_cache import cache_folder
+
+imputer_cache = os.path.join(cache_folder, "imputers")
+
+# IterativeImputer(BayesianRidge) settings of moredata_imputation.py / moredata_synthetic.py;
+# tol is sklearn's early-stopping tolerance (relative to max |X|)
+IMPUTER_CONFIG = {
+    "max_iter": 50,
+    "tol": 1e-3,
+    "random_state": 42,
+    "sample_posterior": False,
+}
+
+_CHANGE_RE = re.compile(r"\[IterativeImputer\] Change: ([^,]+), scaled tolerance: (\S+)")
+
+
+def imputer_config(**overrides):
+    config = {**IMPUTER_CONFIG, **overrides}
+    unknown = set(config) - set(IMPUTER_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown imputer settings: {sorted(unknown)}")
+    return config
+
+
+# sha1 of a table (values, columns, dtypes) and a config dict
+def table_key(X, config):
+    X = pd.DataFrame(X)
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    h.update(json.dumps([list(map(str, X.columns)), list(map(str, X.dtypes))]).encode())
+    h.update(json.dumps(config, sort_keys=True).encode())
+    h.update(sklearn.__version__.encode())
+    return h.hexdigest()
+
+
+def fit_imputer(X, config=None):
+    """
+    Fit IterativeImputer(BayesianRidge) on X and record the convergence of
+    every round: the inf-norm change of the imputed matrix against sklearn's
+    scaled tolerance (read from the verbose output, so no extra fits are needed).
+    Returns (imputer, imputed array, diagnostics DataFrame).
+    """
+
+    config = imputer_config(**(config or {}))
+    imputer = IterativeImputer(estimator=BayesianRidge(), verbose=1, **config)
+
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log), warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ConvergenceWarning)
+        imputed = imputer.fit_transform(X)
+    imputer.verbose = 0
+
+    # the per-round table depends on sklearn's log format; the converged flag does not
+    rows = [(float(change), float(tol)) for change, tol in _CHANGE_RE.findall(log.getvalue())]
+    if not rows:
+        warnings.warn("Could not parse the IterativeImputer convergence log, the per-iteration table is empty.")
+    diagnostics = pd.DataFrame(rows, columns=["change", "scaled_tol"])
+    diagnostics.insert(0, "iteration", np.arange(1, len(diagnostics) + 1))
+    diagnostics["converged"] = diagnostics["change"] < diagnostics["scaled_tol"]
+    diagnostics.attrs["converged"] = imputer.n_iter_ < config["max_iter"] and not any(
+        issubclass(w.category, ConvergenceWarning) for w in caught)
+    diagnostics.attrs["n_iter"] = int(imputer.n_iter_)
+    return imputer, imputed, diagnostics
+
+
+def cached_impute(X, config=None, cache_dir=imputer_cache, refresh=False):
+    """
+    fit_imputer() with the result persisted under cache_dir, keyed by
+    table_key(X, config): a table that was imputed before with the same
+    settings is loaded instead of refitted. Returns (imputed, diagnostics,
+    from_cache).
+    """
+
+    config = imputer_config(**(config or {}))
+    path = os.path.join(cache_dir, table_key(X, config) + ".joblib")
+
+    if not refresh and os.path.exists(path):
+        cached = joblib.load(path)
+        diagnostics = cached["diagnostics"]
+        diagnostics.attrs.update(cached["attrs"])
+        return cached["imputed"], diagnostics, True
+
+    imputer, imputed, diagnostics = fit_imputer(X, config)
+    os.makedirs(cache_dir, exist_ok=True)
+    # written to a temporary file first, so a killed or concurrent fit never leaves a truncated cache
+    tmp = f"{path}.{os.getpid()}.tmp"
+    joblib.dump({"imputer": imputer, "imputed": imputed, "diagnostics": diagnostics,
+                 "attrs": dict(diagnostics.attrs), "config": config}, tmp)
+    os.replace(tmp, path)
+    return imputed, diagnostics, False
+
+
+def load_imputer(X, config=None, cache_dir=imputer_cache):
+    # the fitted IterativeImputer itself (e.g. to transform new rows), None when not cached
+    path = os.path.join(cache_dir, table_key(X, imputer_config(**(config or {}))) + ".joblib")
+    return joblib.load(path)["imputer"] if os.path.exists(path) else None
+
+
+def _impute_job(job):
+    name, X, config, cache_dir, refresh = job
+    return name, cached_impute(X, config, cache_dir, refresh)
+
+
+def impute_stations(tables, config=None, cache_dir=imputer_cache, refresh=False, n_workers=None):
+    """
+    cached_impute() for several tables ({station: X}) in parallel worker
+    processes. Returns {station: (imputed, diagnostics, from_cache)}.
+    """
+
+    jobs = [(name, X, config, cache_dir, refresh) for name, X in tables.items()]
+    if n_workers == 1 or len(jobs) <= 1:
+        return dict(_impute_job(job) for job in jobs)
+
+    with ProcessPoolExecutor(max_workers=min(n_workers or os.cpu_count(), len(jobs))) as pool:
+        return dict(pool.map(_impute_job, jobs))
+
+
+def print_diagnostics(diagnostics, label=""):
+    status = "converged" if diagnostics.attrs.get("converged") else "NOT converged"
+    print(f"MICE {label}: {status} after {diagnostics.attrs.get('n_iter')} iterations")
+    if len(diagnostics):
+        last = diagnostics.iloc[-1]
+        print(f"  last change {last['change']:.3g} (scaled tolerance {last['scaled_tol']:.3g})")
@@ -0,0 +1,63 @@
+import numpy as np
+
+
+def mc_indices(n, n_iter=3000, test_size=0.3, random_seed=42):
+    """
+    Bootstrap and train/validation index sets of every Monte Carlo replicate,
+    drawn with the same seeds as the original loop (sklearn resample and
+    RandomState permutation with random_seed + i).
+
+    Returns (train, val): integer arrays (n_iter, n - n_val) and (n_iter, n_val)
+    of row numbers into X.
+    """
+
+    n_val = max(1, int(np.round(test_size * n)))
+
+    train = np.empty((n_iter, n - n_val), dtype=np.int64)
+    val = np.empty((n_iter, n_val), dtype=np.int64)
+    rs = np.random.RandomState()
+    for i in range(n_iter):
+        # resample(replace=True) draws randint(0, n, n) from RandomState(seed)
+        rs.seed(random_seed + i)
+        boot_idx = rs.randint(0, n, size=n)
+        rs.seed(random_seed + i)
+        perm = rs.permutation(n)
+        val[i] = boot_idx[perm[:n_val]]
+        train[i] = boot_idx[perm[n_val:]]
+    return train, val
+
+
+# r2_score per row (1 / 0 for a constant target, as sklearn's force_finite)
+def _r2_rows(y_true, y_pred):
+    ss_res = ((y_true - y_pred) ** 2).sum(axis=1)
+    ss_tot = ((y_true - y_true.mean(axis=1, keepdims=True)) ** 2).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r2 = 1 - ss_res / ss_tot
+    constant = ss_tot == 0
+    r2[constant] = np.where(ss_res[constant] == 0, 1.0, 0.0)
+    return r2
+
+
+def mc_least_squares(X, y, n_iter=3000, test_size=0.3, random_seed=42):
+    """
+    Batched Monte Carlo bootstrap of the least-squares fit y = X @ coef.
+
+    All replicates are solved at once: the normal equations X_train.T @ X_train
+    are stacked to (n_iter, p, p) and inverted with a batched pinv, as in the
+    loop version. Returns (coeffs (n_iter, p), rmse (n_iter,), r2 (n_iter,)).
+    """
+
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    train, val = mc_indices(len(X), n_iter, test_size, random_seed)
+
+    X_train = X[train]                              # (n_iter, n_train, p)
+    X_train_T = X_train.transpose(0, 2, 1)
+    coeffs = (np.linalg.pinv(X_train_T @ X_train) @ X_train_T @ y[train][:, :, None])[:, :, 0]
+
+    y_val = y[val]
+    y_pred_val = np.einsum("bvp,bp->bv", X[val], coeffs)
+
+    rmse = np.sqrt(((y_val - y_pred_val) ** 2).mean(axis=1))
+    r2 = _r2_rows(y_val, y_pred_val) if val.shape[1] > 1 else np.full(n_iter, np.nan)
+    return coeffs, rmse, r2
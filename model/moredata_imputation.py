@@ -1,25 +1,18 @@
-import pandas as pd
-import numpy as np
-from sklearn.experimental import enable_iterative_imputer
-from sklearn.impute import IterativeImputer
-from sklearn.linear_model import BayesianRidge
 import os
+import sys
 
-df = pd.read_excel(
-    "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/MS_In_situ_Vannmiljo_lakes_coastals.xlsx"
-)
-df = df[df["s"] == "VT16"].copy()
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extra"))
+from data_cache import load_insitu
+from imputation_cache import cached_impute, print_diagnostics
+
+df = load_insitu(stations="VT16")
 
 df = df.rename(columns={
     "CDOM_insitu": "CDOM",
     "KLFA_insitu": "KLFA",
     "TSM_insitu": "TSM",
-    "s": "Station",
-    "Prøvetakingstidspunkt": "date"
 })
 
-df["date"] = pd.to_datetime(df["date"])
-
 # Aggregate per day
 vars_to_model = ["KLFA", "TSM", "SECCI", "CDOM"]
 df_daily = df.groupby("date", as_index=False)[vars_to_model].mean()
@@ -28,15 +21,11 @@ df_daily["month"] = df_daily["date"].dt.month
 
 print(df_daily)
 
-# MICE IMPUTATION
-imputer = IterativeImputer(
-    estimator=BayesianRidge(),
-    max_iter=50,
-    random_state=42,
-    sample_posterior=False
-)
+# MICE IMPUTATION (cached fit, see imputation_cache.py)
+imputed_array, mice_diagnostics, from_cache = cached_impute(df_daily[vars_to_model], {"max_iter": 50, "random_state": 42})
+print_diagnostics(mice_diagnostics, "(cached)" if from_cache else "")
+print(mice_diagnostics)
 
-imputed_array = imputer.fit_transform(df_daily[vars_to_model])
 df_imp = df_daily.copy()
 df_imp[vars_to_model] = imputed_array
 
@@ -0,0 +1,208 @@
+import os
+import math
+import warnings
+import itertools
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from synthetic_generator import VARS_TO_MODEL
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+DIST_COLS = ["n_real", "n_synth", "mean_real", "mean_synth", "std_real", "std_synth",
+             "ks", "ks_p", "ad", "ad_p", "qq_rmse", "qq_max", "qq_nrmse"]
+
+UNITS = {
+    "CDOM": "m⁻¹",
+    "KLFA": "mg m$^{-3}$",
+    "TSM": "g m$^{-3}$",
+    "SECCI": "m",
+}
+
+
+# Anderson-Darling k-sample statistic and (capped) p-value of one variable
+def _anderson(a, b):
+    if len(a) < 2 or len(b) < 2:
+        return np.nan, np.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        res = stats.anderson_ksamp([a, b])
+    return res.statistic, res.pvalue
+
+
+def _compare(real, synth):
+    """
+    Statistics of all variables of one group at once: real and synth are
+    (n, n_vars) arrays with NaN for missing values. Returns {stat: (n_vars,)}.
+    """
+
+    ks = stats.ks_2samp(real, synth, axis=0, nan_policy="omit")
+    q_real = np.nanquantile(real, QUANTILES, axis=0)
+    q_synth = np.nanquantile(synth, QUANTILES, axis=0)
+    q_err = q_synth - q_real
+    iqr = np.nanquantile(real, 0.75, axis=0) - np.nanquantile(real, 0.25, axis=0)
+    ad = [_anderson(r[~np.isnan(r)], s[~np.isnan(s)]) for r, s in zip(real.T, synth.T)]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        qq_rmse = np.sqrt(np.mean(q_err ** 2, axis=0))
+        return {
+            "n_real": np.sum(~np.isnan(real), axis=0),
+            "n_synth": np.sum(~np.isnan(synth), axis=0),
+            "mean_real": np.nanmean(real, axis=0),
+            "mean_synth": np.nanmean(synth, axis=0),
+            "std_real": np.nanstd(real, axis=0, ddof=1),
+            "std_synth": np.nanstd(synth, axis=0, ddof=1),
+            "ks": np.atleast_1d(ks.statistic),
+            "ks_p": np.atleast_1d(ks.pvalue),
+            "ad": np.array([a[0] for a in ad]),
+            "ad_p": np.array([a[1] for a in ad]),
+            "qq_rmse": qq_rmse,
+            "qq_max": np.max(np.abs(q_err), axis=0),
+            "qq_nrmse": qq_rmse / iqr,
+        }
+
+
+def _groups(real, synth, by):
+    # (keys, real group, synthetic group) for every group present in both tables
+    if not by:
+        yield {}, real, synth
+        return
+    synth_groups = dict(iter(synth.groupby(by, observed=True, sort=True)))
+    for keys, g_real in real.groupby(by, observed=True, sort=True):
+        if keys in synth_groups:
+            yield dict(zip(by, keys)), g_real, synth_groups[keys]
+
+
+def distribution_diagnostics(real, synth, vars_=VARS_TO_MODEL, by=("Station",)):
+    """
+    Real vs synthetic distribution of every variable per group (by columns):
+    n, mean, std, two-sample KS and Anderson-Darling statistics with p-values,
+    and the RMSE / max error of the 1-99 % quantiles (qq_nrmse = qq_rmse / IQR
+    of the real data). One row per group and variable.
+    """
+
+    by = list(by)
+    rows = []
+    for keys, g_real, g_synth in _groups(real, synth, by):
+        res = _compare(g_real[vars_].to_numpy(float), g_synth[vars_].to_numpy(float))
+        for j, var in enumerate(vars_):
+            rows.append({**keys, "variable": var, **{c: res[c][j] for c in DIST_COLS}})
+    return pd.DataFrame(rows, columns=by + ["variable"] + DIST_COLS)
+
+
+def correlation_diagnostics(real, synth, vars_=VARS_TO_MODEL, by=("Station",), method="spearman"):
+    """
+    Difference of the correlation matrices (synthetic - real) per group: the
+    Frobenius norm and max |difference| of the off-diagonal part, plus one
+    corr_diff_<a>_<b> column per variable pair.
+    """
+
+    by = list(by)
+    pairs = list(itertools.combinations(range(len(vars_)), 2))
+    iu = tuple(np.array(pairs).T)
+
+    rows = []
+    for keys, g_real, g_synth in _groups(real, synth, by):
+        diff = (g_synth[vars_].corr(method=method).to_numpy() - g_real[vars_].corr(method=method).to_numpy())[iu]
+        row = {**keys, "corr_frob": np.sqrt(2 * np.nansum(diff ** 2)), "corr_max": np.nanmax(np.abs(diff))}
+        row.update({f"corr_diff_{vars_[a]}_{vars_[b]}": d for (a, b), d in zip(pairs, diff)})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def ensemble_diagnostics(ensemble, vars_=VARS_TO_MODEL, by=("station", "klfa_method", "seed"), out_dir=None):
+    """
+    distribution_diagnostics / correlation_diagnostics of every realisation of
+    a synthetic ensemble (load_ensemble()): the synthetic rows against the
+    daily table they were drawn from. Written to out_dir/_diagnostics_*.parquet
+    when out_dir is given.
+    """
+
+    ensemble = ensemble.copy()
+    for col in by:
+        if isinstance(ensemble[col].dtype, pd.CategoricalDtype):
+            ensemble[col] = ensemble[col].astype(ensemble[col].cat.categories.dtype)
+
+    real = ensemble[~ensemble["is_synthetic"]]
+    synth = ensemble[ensemble["is_synthetic"]]
+    dist = distribution_diagnostics(real, synth, vars_, by)
+    corr = correlation_diagnostics(real, synth, vars_, by)
+
+    if out_dir is not None:
+        dist.to_parquet(os.path.join(out_dir, "_diagnostics_distributions.parquet"), index=False)
+        corr.to_parquet(os.path.join(out_dir, "_diagnostics_correlations.parquet"), index=False)
+    return dist, corr
+
+
+# ==============================
+# SMALL-MULTIPLE PLOTS
+# ==============================
+
+def _var_axes(vars_, ncols=2, size=(8, 4)):
+    import matplotlib.pyplot as plt
+
+    nrows = math.ceil(len(vars_) / ncols)
+    fig, axes = plt.subplots(nrows, ncols, figsize=(size[0] * ncols, size[1] * nrows), squeeze=False)
+    axes = axes.flatten()
+    for ax in axes[len(vars_):]:
+        ax.axis("off")
+    return fig, axes
+
+
+def plot_histograms(real, synth, vars_=VARS_TO_MODEL, save_path=None, bins=20, title="Real vs Synthetic Data Distributions"):
+    fig, axes = _var_axes(vars_)
+    for ax, var in zip(axes, vars_):
+        r = real[var].dropna()
+        s = synth[var].dropna()
+        edges = np.histogram_bin_edges(np.concatenate([r, s]), bins=bins)
+        ax.hist(r, bins=edges, alpha=0.6, density=True, label="Real", edgecolor="black")
+        ax.hist(s, bins=edges, alpha=0.6, density=True, label="Synthetic", edgecolor="black")
+        ax.set_title(var)
+        ax.set_xlabel(f"{var} ({UNITS.get(var, '')})")
+        ax.set_ylabel("Density")
+        ax.legend()
+        ax.grid(True, linestyle="--", alpha=0.3)
+    return _finish(fig, title, save_path)
+
+
+def plot_qq(real, synth, vars_=VARS_TO_MODEL, save_path=None, title="Real vs Synthetic Quantiles"):
+    q_real = np.nanquantile(real[vars_].to_numpy(float), QUANTILES, axis=0)
+    q_synth = np.nanquantile(synth[vars_].to_numpy(float), QUANTILES, axis=0)
+
+    fig, axes = _var_axes(vars_, size=(5, 5))
+    for j, (ax, var) in enumerate(zip(axes, vars_)):
+        lo = min(q_real[0, j], q_synth[0, j])
+        hi = max(q_real[-1, j], q_synth[-1, j])
+        ax.plot([lo, hi], [lo, hi], color="gray", linestyle="--", linewidth=1)
+        ax.plot(q_real[:, j], q_synth[:, j], "o", markersize=3)
+        ax.set_title(var)
+        ax.set_xlabel(f"Real ({UNITS.get(var, '')})")
+        ax.set_ylabel(f"Synthetic ({UNITS.get(var, '')})")
+        ax.grid(True, linestyle="--", alpha=0.3)
+    return _finish(fig, title, save_path)
+
+
+def plot_timeseries(real, synth, vars_=VARS_TO_MODEL, save_path=None, title="Real vs Synthetic Data Time Series"):
+    real = real.sort_values("date")
+    synth = synth.sort_values("date")
+    fig, axes = _var_axes(vars_)
+    for ax, var in zip(axes, vars_):
+        ax.plot(real["date"], real[var], marker="o", linestyle="-", label="Real")
+        ax.plot(synth["date"], synth[var], marker="x", linestyle="none", label="Synthetic")
+        ax.set_title(var)
+        ax.set_ylabel(f"{var} ({UNITS.get(var, '')})")
+        ax.legend()
+        ax.grid(True, linestyle="--", alpha=0.3)
+    return _finish(fig, title, save_path)
+
+
+def _finish(fig, title, save_path):
+    import matplotlib.pyplot as plt
+
+    fig.suptitle(title, fontsize=15)
+    fig.tight_layout(rect=[0, 0, 1, 0.95])
+    if save_path is not None:
+        fig.savefig(save_path)
+        plt.close(fig)
+    return fig
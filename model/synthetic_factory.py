@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+import itertools
+import tempfile
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extra"))
+from data_cache import data_folder, load_insitu
+from synthetic_generator import VARS_TO_MODEL, BOUNDS, KLFA_METHODS, daily_table, impute_daily, synthetic_samples
+from imputation_cache import impute_stations, print_diagnostics
+from synthetic_diagnostics import ensemble_diagnostics
+
+# station=<s>/klfa_method=<m>/seed=<n>/synthetic.parquet + _config.json, _manifest.parquet at the root
+# (the "_" files are skipped when the data set is read with pd.read_parquet(root))
+output_root = os.path.join(data_folder, "model", "synthetic")
+
+OUTPUT_COLS = ["date", "Station"] + VARS_TO_MODEL + ["is_interpolated", "is_synthetic"]
+
+# in-situ rows of every station, shared with the worker processes (set once per pool)
+_SHARED = {}
+
+
+def _init_worker(raw_by_station):
+    _SHARED["raw"] = raw_by_station
+
+
+def partition_dir(root, station, klfa_method, seed):
+    return os.path.join(root, f"station={station}", f"klfa_method={klfa_method}", f"seed={seed}")
+
+
+def realisation(df_raw, station, seed, klfa_method="mvn", n_synth=200, years=(2018, 2024),
+                jitter=1e-8, bandwidth=0.15, impute_seed=42, bounds=BOUNDS, vars_=VARS_TO_MODEL):
+    """
+    One synthetic data set: MICE-imputed daily means of the station plus
+    n_synth month-wise MVN rows (KLFA from the MVN, lognormal or KDE), with the
+    same columns as the VT16_imputed_plus_synthetic*.csv files. The MICE fit
+    depends only on the station and impute_seed, so it comes from the imputer
+    cache for every seed / KLFA method after the first.
+    """
+
+    df_full = impute_daily(df_raw, station, vars_, bounds, impute_seed)
+    df_synth = synthetic_samples(df_full, vars_, n_synth=n_synth, bounds=bounds, years=years, station=station,
+                                 seed=seed, klfa_method=klfa_method, jitter=jitter, bandwidth=bandwidth)
+
+    df_full["is_interpolated"] = df_full[[v + "_imputed" for v in vars_]].any(axis=1)
+    df_full["is_synthetic"] = False
+    df_synth["is_synthetic"] = True
+    return pd.concat([df_full[OUTPUT_COLS], df_synth[OUTPUT_COLS]], ignore_index=True), len(df_full), len(df_synth)
+
+
+def _run_job(job):
+    config, root = job
+    combined, n_real, n_synth = realisation(_SHARED["raw"][config["station"]], config["station"], config["seed"],
+                                            config["klfa_method"], config["n_synth"], tuple(config["years"]),
+                                            config["jitter"], config["bandwidth"], config["impute_seed"])
+
+    out_dir = partition_dir(root, config["station"], config["klfa_method"], config["seed"])
+    os.makedirs(out_dir, exist_ok=True)
+    combined.to_parquet(os.path.join(out_dir, "synthetic.parquet"), index=False)
+
+    record = {**config, "n_real": n_real, "n_synthetic": n_synth, "path": out_dir}
+    with open(os.path.join(out_dir, "_config.json"), "w", encoding="utf-8") as fh:
+        json.dump(record, fh, indent=1)
+    return record
+
+
+def synthetic_ensemble(stations=("VT16",), seeds=(42,), klfa_methods=("lognormal",), n_synth=200,
+                       years=(2018, 2024), jitter=1e-8, bandwidth=0.15, impute_seed=42, root=output_root,
+                       depth=None, overwrite=False, n_workers=None, diagnostics=True, raw_by_station=None):
+    """
+    realisation() for every station x seed x KLFA method, run in a process pool.
+
+    Each realisation is written to its own partition of a hive-partitioned
+    Parquet data set under root (readable with pd.read_parquet(root)) together
+    with a _config.json; _manifest.parquet lists the configuration of every
+    partition. Existing partitions with the same configuration are kept unless
+    overwrite=True. With diagnostics=True the real vs synthetic distribution
+    and correlation diagnostics of every partition are written next to the
+    manifest (_diagnostics_*.parquet). raw_by_station ({station: in-situ rows
+    with CDOM/KLFA/TSM/SECCI columns}) replaces the load_insitu() read.
+    Returns the manifest.
+    """
+
+    unknown = set(klfa_methods) - set(KLFA_METHODS)
+    if unknown:
+        raise ValueError(f"Unknown KLFA methods {sorted(unknown)}, expected {KLFA_METHODS}")
+
+    jobs = []
+    for station, seed, method in itertools.product(stations, seeds, klfa_methods):
+        config = {"station": station, "seed": int(seed), "klfa_method": method, "n_synth": n_synth,
+                  "years": list(years), "jitter": jitter, "bandwidth": bandwidth, "impute_seed": impute_seed,
+                  "depth": depth, "columns": OUTPUT_COLS}
+        config_file = os.path.join(partition_dir(root, station, method, seed), "_config.json")
+        if not overwrite and os.path.exists(config_file):
+            with open(config_file, "r", encoding="utf-8") as fh:
+                done = json.load(fh)
+            if all(done.get(k) == v for k, v in config.items()):
+                continue
+        jobs.append((config, root))
+
+    print(f"Synthetic ensemble: {len(jobs)} realisations to generate")
+    if jobs:
+        # one in-situ read per station, shared with the workers
+        raw_by_station = dict(raw_by_station or {})
+        for station in dict.fromkeys(config["station"] for config, _ in jobs):
+            if station in raw_by_station:
+                continue
+            df_raw = load_insitu(stations=station, depth=depth)
+            raw_by_station[station] = df_raw.rename(columns={
+                "CDOM_insitu": "CDOM",
+                "KLFA_insitu": "KLFA",
+                "TSM_insitu": "TSM",
+            })
+
+        # one MICE fit per station (in parallel), cached for the realisations
+        tables = {station: daily_table(df_raw, station)[VARS_TO_MODEL] for station, df_raw in raw_by_station.items()}
+        fits = impute_stations(tables, {"random_state": impute_seed}, n_workers=n_workers)
+        for station, (_, mice_diag, _) in fits.items():
+            print_diagnostics(mice_diag, station)
+
+        # n_workers=1 runs in-process
+        if n_workers == 1:
+            _init_worker(raw_by_station)
+            for job in jobs:
+                _run_job(job)
+        else:
+            n_workers = n_workers or os.cpu_count()
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(raw_by_station,)) as pool:
+                for record in pool.map(_run_job, jobs):
+                    print(f"{record['station']} seed={record['seed']} {record['klfa_method']}: "
+                          f"{record['n_real']} real + {record['n_synthetic']} synthetic rows")
+
+    manifest = write_manifest(root)
+    if diagnostics and not manifest.empty:
+        dist, _ = ensemble_diagnostics(load_ensemble(root), out_dir=root)
+        print(dist.groupby(["station", "klfa_method", "variable"])[["ks", "qq_nrmse"]].median())
+    return manifest
+
+
+# manifest of all partitions (from their _config.json files)
+def write_manifest(root=output_root):
+    records = []
+    for dirpath, _, files in os.walk(root):
+        if "_config.json" in files:
+            with open(os.path.join(dirpath, "_config.json"), "r", encoding="utf-8") as fh:
+                records.append(json.load(fh))
+
+    manifest = pd.DataFrame(records)
+    if len(manifest):
+        manifest["years"] = manifest["years"].astype(str)
+        manifest = manifest.sort_values(["station", "klfa_method", "seed"]).reset_index(drop=True)
+        os.makedirs(root, exist_ok=True)
+        manifest.to_parquet(os.path.join(root, "_manifest.parquet"), index=False)
+    return manifest
+
+
+def load_ensemble(root=output_root, stations=None, klfa_methods=None, seeds=None):
+    filters = []
+    if stations is not None:
+        filters.append(("station", "in", list(stations)))
+    if klfa_methods is not None:
+        filters.append(("klfa_method", "in", list(klfa_methods)))
+    if seeds is not None:
+        filters.append(("seed", "in", [int(s) for s in seeds]))
+    return pd.read_parquet(root, filters=filters or None)
+
+
+# random in-situ rows with gaps, for check_ensemble()
+def _fake_insitu(station, n_days=400, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2018-01-01") + pd.to_timedelta(np.sort(rng.choice(6 * 365, n_days, replace=False)), "D")
+    df = pd.DataFrame({"date": dates, "Station": station})
+    for col, (lower, upper) in BOUNDS.items():
+        values = rng.uniform(lower, upper, n_days)
+        values[rng.random(n_days) < 0.3] = np.nan
+        df[col] = values
+    return df
+
+
+def check_ensemble(root=None, stations=("VT12", "VT16", "VT79"), seeds=range(4), klfa_methods=KLFA_METHODS,
+                   n_workers=None):
+    """
+    End-to-end run of synthetic_ensemble() on random in-situ rows (written to
+    a temporary folder unless root is given): every partition, the manifest
+    and the diagnostics tables must be there, twice (the second run reuses all
+    partitions). Raises AssertionError otherwise.
+    """
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = root or tmp
+        raw = {station: _fake_insitu(station, seed=i) for i, station in enumerate(stations)}
+        n_expected = len(stations) * len(seeds) * len(klfa_methods)
+
+        for _ in range(2):
+            manifest = synthetic_ensemble(stations, seeds, klfa_methods, n_synth=50, root=root,
+                                          n_workers=n_workers, raw_by_station=raw)
+            assert len(manifest) == n_expected, f"{len(manifest)} partitions, expected {n_expected}"
+
+            dist = pd.read_parquet(os.path.join(root, "_diagnostics_distributions.parquet"))
+            corr = pd.read_parquet(os.path.join(root, "_diagnostics_correlations.parquet"))
+            assert len(dist) == n_expected * len(VARS_TO_MODEL) and len(corr) == n_expected
+            assert dist["n_synth"].gt(0).all()
+
+        ensemble = load_ensemble(root)
+        assert ensemble["is_synthetic"].sum() == n_expected * 50
+    print(f"check_ensemble: {n_expected} realisations OK")
+
+
+if __name__ == "__main__":
+    manifest = synthetic_ensemble(
+        stations=["VT12", "VT16", "VT79"],
+        seeds=range(100),
+        klfa_methods=["lognormal", "kde"],
+        n_synth=200,
+    )
+    print(manifest.groupby(["station", "klfa_method"]).size())
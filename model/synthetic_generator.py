@@ -0,0 +1,259 @@
+import os
+import sys
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extra"))
+from data_cache import cache_folder
+from imputation_cache import cached_impute, table_key
+
+klfa_cache = os.path.join(cache_folder, "klfa_distributions")
+
+VARS_TO_MODEL = ["KLFA", "TSM", "SECCI", "CDOM"]
+
+# physical bounds of the imputed and synthetic values
+BOUNDS = {
+    "SECCI": (5, 25),
+    "CDOM": (0.07, 0.56),
+    "KLFA": (0.12, 5.1),
+    "TSM": (0.097, 5.9),
+}
+
+KLFA_METHODS = ("mvn", "lognormal", "kde")
+
+
+def restore_complete_rows(df_imp, complete_by_date, vars_=VARS_TO_MODEL):
+    """
+    Overwrite (in place) the rows of df_imp whose date has a fully observed raw
+    row with those exact raw values, aligned on the date in one assignment, and
+    check the result with one array comparison. Returns the boolean mask of the
+    restored rows.
+    """
+
+    restored = df_imp["date"].isin(complete_by_date.index).to_numpy()
+    raw_values = complete_by_date.loc[df_imp.loc[restored, "date"], vars_].to_numpy(float)
+    df_imp.loc[restored, vars_] = raw_values
+
+    imp_values = df_imp.loc[restored, vars_].to_numpy(float)
+    mismatch = imp_values != raw_values
+    if mismatch.any():
+        rows, cols = np.nonzero(mismatch)
+        dates = df_imp.loc[restored, "date"].to_numpy()
+        for r, c in zip(rows[:20], cols[:20]):
+            print((dates[r], vars_[c], raw_values[r, c], imp_values[r, c]))
+        raise AssertionError("Restored rows do not exactly match original raw rows. See above.")
+    return restored
+
+
+# daily means of one station (the table MICE is fitted on)
+def daily_table(df_raw, station, vars_=VARS_TO_MODEL):
+    df_daily = df_raw.groupby("date", as_index=False)[vars_].mean()
+    df_daily["Station"] = station
+    df_daily["month"] = df_daily["date"].dt.month
+    return df_daily
+
+
+def impute_daily(df_raw, station, vars_=VARS_TO_MODEL, bounds=BOUNDS, seed=42, max_iter=50, tol=1e-3):
+    """
+    Daily means of one station, gaps filled with MICE (BayesianRidge), as in
+    moredata_synthetic.py: dates with a fully observed raw row keep those exact
+    values, <var>_imputed marks the cells that were missing in the daily table,
+    and everything is clipped to bounds. The fit is cached (cached_impute), and
+    its convergence diagnostics are in df_imp.attrs["mice"].
+    """
+
+    complete = df_raw[df_raw[vars_].notna().all(axis=1)]
+    complete_by_date = complete.sort_values("date").drop_duplicates(subset="date", keep="first").set_index("date")
+
+    df_daily = daily_table(df_raw, station, vars_)
+    imputed, diagnostics, _ = cached_impute(df_daily[vars_], {"max_iter": max_iter, "tol": tol, "random_state": seed})
+    df_imp = df_daily.copy()
+    df_imp[vars_] = imputed
+
+    restored = restore_complete_rows(df_imp, complete_by_date, vars_)
+
+    for col in vars_:
+        df_imp[col + "_imputed"] = df_daily[col].isna().values & ~restored
+
+    for col, (lower, upper) in bounds.items():
+        df_imp[col] = df_imp[col].clip(lower, upper)
+    df_imp.attrs["mice"] = diagnostics
+    return df_imp
+
+
+# per-month mean/cov shrunk towards the global ones (alpha = n / 20, at least 4 rows)
+def month_stats(df_full, vars_, month_col="month"):
+    global_mean = df_full[vars_].mean().values
+    global_cov = df_full[vars_].cov().values
+
+    stats = {}
+    for m in range(1, 13):
+        dfm = df_full[df_full[month_col] == m][vars_]
+        if len(dfm) >= 4:
+            alpha = min(1.0, len(dfm) / 20)
+            mean_used = alpha * dfm.mean().values + (1 - alpha) * global_mean
+            cov_used = alpha * dfm.cov().values + (1 - alpha) * global_cov
+        else:
+            mean_used = global_mean
+            cov_used = global_cov
+        stats[m] = (mean_used, cov_used)
+    return stats
+
+
+# synthetic rows per month, inversely proportional to the observed months
+def month_allocation(months, n_synth):
+    counts_by_month = pd.Series(months).value_counts().reindex(range(1, 13), fill_value=0).values
+    inv = (counts_by_month.max() + 1) - counts_by_month
+    if inv.sum() == 0:
+        alloc = np.full(12, n_synth // 12)
+    else:
+        alloc = np.floor(n_synth * inv / inv.sum()).astype(int)
+    # the floors lose less than one row per month, so rem < 12
+    rem = n_synth - alloc.sum()
+    alloc[:rem] += 1
+    return alloc
+
+
+# fitted KLFA distributions of this process, by table_key
+_KLFA_MEMO = {}
+
+
+def _fit_klfa(klfa, months, method, bandwidth):
+    pos = klfa > 0
+    if pos.sum() < 5:
+        raise RuntimeError("Not enough positive KLFA values to fit global distribution.")
+
+    # month-indexed arrays (index 0 unused); months with < 5 positive values use the global fit
+    month_vals = [klfa[pos & (months == m)] for m in range(1, 13)]
+    month_vals = [vals if len(vals) >= 5 else klfa[pos] for vals in month_vals]
+
+    if method == "lognormal":
+        logs = [np.log(vals) for vals in month_vals]
+        return {
+            "method": method,
+            "mu": np.array([np.nan] + [v.mean() for v in logs]),
+            "sigma": np.array([np.nan] + [v.std() for v in logs]),
+        }
+
+    # gaussian KDE = the training values of the month plus N(0, bandwidth) noise
+    counts = np.array([0] + [len(vals) for vals in month_vals])
+    return {
+        "method": method,
+        "values": np.concatenate(month_vals),
+        "offsets": np.concatenate([[0], np.cumsum(counts)[:-1]]),
+        "counts": counts,
+        "bandwidth": bandwidth,
+    }
+
+
+def klfa_distributions(df_full, method, month_col="month", bandwidth=0.15, cache_dir=klfa_cache):
+    """
+    Per-month KLFA distributions for one method only: lognormal mu/sigma of
+    log(KLFA) or the KDE training values, with the global fit for months with
+    fewer than 5 positive values. Fitted lazily and kept per process and on
+    disk (cache_dir, None = memory only), keyed on the KLFA/month data.
+    """
+
+    key = table_key(df_full[["KLFA", month_col]], {"method": method, "bandwidth": bandwidth})
+    if key in _KLFA_MEMO:
+        return _KLFA_MEMO[key]
+
+    path = os.path.join(cache_dir, key + ".joblib") if cache_dir else None
+    if path and os.path.exists(path):
+        dist = joblib.load(path)
+    else:
+        dist = _fit_klfa(df_full["KLFA"].to_numpy(float), df_full[month_col].to_numpy(), method, bandwidth)
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            joblib.dump(dist, tmp)
+            os.replace(tmp, path)
+
+    _KLFA_MEMO[key] = dist
+    return dist
+
+
+# KLFA samples for every row in one draw (months: month of each row)
+def sample_klfa(dist, months, rng):
+    if dist["method"] == "lognormal":
+        return np.exp(rng.normal(dist["mu"][months], dist["sigma"][months]))
+
+    idx = dist["offsets"][months] + (rng.random(len(months)) * dist["counts"][months]).astype(np.int64)
+    return np.maximum(rng.normal(dist["values"][idx], dist["bandwidth"]), 1e-8)
+
+
+# samples assigned by rank within each month, so the rank correlation with the other variables is kept
+def rank_map(draws, samples, months):
+    order_draws = np.lexsort((draws, months))
+    order_samples = np.lexsort((samples, months))
+    mapped = np.empty_like(draws)
+    mapped[order_draws] = samples[order_samples]
+    return mapped
+
+
+def synthetic_samples(df_full, vars_, n_synth=200, bounds=None, years=(2018, 2024), station="VT16",
+                      seed=42, month_col="month", klfa_method="mvn", jitter=1e-8, bandwidth=0.15,
+                      klfa_cache_dir=klfa_cache):
+    """
+    Synthetic in-situ rows drawn from the month-wise multivariate normals.
+
+    For every month the MVN samples, years and days (1..days in that month)
+    are drawn as arrays and the dates built with datetime64 month arithmetic,
+    so there is no per-row Python work; the frame is assembled column-wise.
+    The random stream is the same as the row-by-row loop of
+    moredata_synthetic.py, so a given seed gives the same samples.
+
+    klfa_method "lognormal" / "kde" replaces the MVN KLFA by samples of the
+    monthly lognormal / KDE fit (klfa_distributions), drawn for all months at
+    once after the MVN draws and mapped by rank within each month.
+    """
+
+    if klfa_method not in KLFA_METHODS:
+        raise ValueError(f"klfa_method must be one of {KLFA_METHODS}")
+
+    rng = np.random.default_rng(seed) if not isinstance(seed, np.random.Generator) else seed
+    stats = month_stats(df_full, vars_, month_col)
+    alloc = month_allocation(df_full[month_col], n_synth)
+
+    values, dates, months = [], [], []
+    for month, k in enumerate(alloc, start=1):
+        mean_used, cov_used = stats[month]
+        cov_reg = cov_used + jitter * np.eye(cov_used.shape[0])
+        if k <= 0:
+            continue
+
+        draws = rng.multivariate_normal(mean=mean_used, cov=cov_reg, size=k)
+        year = rng.integers(years[0], years[1], size=k)
+
+        first = ((year - 1970) * 12 + (month - 1)).astype("datetime64[M]")
+        n_days = ((first + 1).astype("datetime64[D]") - first.astype("datetime64[D]")).astype(int)
+        day = rng.integers(1, n_days + 1)
+
+        values.append(draws)
+        dates.append(first.astype("datetime64[D]") + (day - 1))
+        months.append(np.full(k, month))
+
+    if not values:
+        values = np.empty((0, len(vars_)))
+        dates = np.empty(0, dtype="datetime64[ns]")
+    else:
+        values = np.concatenate(values)
+        dates = np.concatenate(dates).astype("datetime64[ns]")
+        months = np.concatenate(months)
+
+        if klfa_method != "mvn":
+            dist = klfa_distributions(df_full, klfa_method, month_col, bandwidth, klfa_cache_dir)
+            samples = sample_klfa(dist, months, rng)
+            if bounds and "KLFA" in bounds:
+                samples = np.clip(samples, *bounds["KLFA"])
+            col_idx = vars_.index("KLFA")
+            values[:, col_idx] = rank_map(values[:, col_idx], samples, months)
+
+    df_synth = pd.DataFrame({"date": dates, **{col: values[:, j] for j, col in enumerate(vars_)}})
+    df_synth["Station"] = station
+    df_synth["is_interpolated"] = True
+
+    for col, (lower, upper) in (bounds or {}).items():
+        df_synth[col] = df_synth[col].clip(lower, upper)
+    return df_synth
@@ -0,0 +1,112 @@
+import time
+import numpy as np
+
+
+def wls_ridge(A, y, sigma=None, lam=0.01):
+    """
+    Weighted Least Squares with Ridge regularization
+
+    Minimize:
+        ||W (Ax - y)||^2 + lam ||x||^2
+
+    The rows of A and y are scaled by sqrt(weights) (weights = 1/sigma^2), so
+    only the p x p normal equations are formed: O(n p^2) time, O(n p) memory.
+
+    Parameters
+    ----------
+    A : (n, p) array
+    y : (n,) array
+    sigma : (n,) array or None
+        Standard deviation of y (weights = 1/sigma^2)
+    lam : float
+        Ridge regularization strength
+    """
+
+    A = np.asarray(A, dtype=float)
+    y = np.asarray(y, dtype=float)
+    p = A.shape[1]
+
+    if sigma is not None:
+        sw = 1.0 / np.asarray(sigma, dtype=float)
+        A = A * sw[:, None]
+        y = y * sw
+
+    lhs = A.T @ A + lam * np.eye(p)
+    rhs = A.T @ y
+    return np.linalg.solve(lhs, rhs)
+
+
+def wls_ridge_batch(A, y, weights=None, lams=0.01):
+    """
+    wls_ridge for several weight vectors and ridge strengths at once.
+
+    weights : None, (n,) or (k, n) array of row weights (1/sigma^2)
+    lams    : scalar or (m,) array
+    Returns coefficients of shape (k, m, p) (k = 1 for None / one weight vector).
+    """
+
+    A = np.asarray(A, dtype=float)
+    y = np.asarray(y, dtype=float)
+    p = A.shape[1]
+
+    W = np.ones((1, len(y))) if weights is None else np.atleast_2d(np.asarray(weights, dtype=float))
+    lams = np.atleast_1d(np.asarray(lams, dtype=float))
+
+    WA = W[:, :, None] * A                     # (k, n, p)
+    AtWA = A.T @ WA                            # (k, p, p)
+    AtWy = np.einsum("knp,n->kp", WA, y)       # (k, p)
+
+    lhs = AtWA[:, None] + lams[None, :, None, None] * np.eye(p)
+    rhs = np.broadcast_to(AtWy[:, None, :, None], lhs.shape[:-1] + (1,))
+    return np.linalg.solve(lhs, rhs)[..., 0]
+
+
+# the n x n weight-matrix version from model_ASTAR_NAP.ipynb (benchmark reference)
+def wls_ridge_dense(A, y, sigma=None, lam=0.01):
+    n, p = A.shape
+
+    if sigma is None:
+        W = np.eye(n)
+    else:
+        W = np.diag(1.0 / sigma**2)
+
+    AtW = A.T @ W
+    lhs = AtW @ A + lam * np.eye(p)
+    rhs = AtW @ y
+    return np.linalg.solve(lhs, rhs)
+
+
+def _best_time(func, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def benchmark(sizes=(100, 10_000, 1_000_000), p=4, max_dense_bytes=2e9, seed=0):
+    rng = np.random.default_rng(seed)
+
+    for n in sizes:
+        A = rng.random((n, p))
+        y = A @ rng.random(p) + rng.normal(0, 0.05, n)
+        sigma = rng.uniform(0.02, 0.1, n)
+
+        t_new, coef_new = _best_time(lambda: wls_ridge(A, y, sigma, 0.01))
+        line = f"n={n:>9,}  sqrt-weight: {t_new * 1e3:9.3f} ms"
+
+        if n * n * 8 <= max_dense_bytes:
+            t_old, coef_old = _best_time(lambda: wls_ridge_dense(A, y, sigma, 0.01), repeat=1)
+            same = np.allclose(coef_new, coef_old, rtol=1e-8)
+            line += f"   dense W: {t_old * 1e3:10.3f} ms   speed-up {t_old / t_new:8.1f}x   same={same}"
+        else:
+            line += f"   dense W: skipped ({n * n * 8 / 1e9:,.0f} GB weight matrix)"
+
+        t_batch, _ = _best_time(lambda: wls_ridge_batch(A, y, 1.0 / sigma**2, np.logspace(-6, 0, 20)))
+        line += f"   batch (20 lam): {t_batch * 1e3:9.3f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,15 +1,25 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import sys
 import numpy as np
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "NVE"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extra"))
+from discharge_stats import load_discharge_stats
+from data_cache import load_satellite
+
+years = range(2018, 2024)
+param_name = "TSM_665"
+riv_name = "Flåm bru"
+station = "72.77.0"
+
 # Load data
-df_discharge = pd.read_csv("/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/NVE_data/discharge/Q_daily-mean_ Flåm bru_ Flåm bru_72.77.0_download-2025-09-24.csv")
-df_tsm = pd.read_excel("/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/Sentinel3_pixel_clean.xlsx")
+df_discharge = load_discharge_stats(stations=[station], years=years)["daily"]
+# choose station VT79 
+df_tsm = load_satellite(columns=["spm_nechad_665_mean"], stations="VT79")
 
 df_discharge = df_discharge.dropna(subset=["value"])
-# choose station VT79 
-df_tsm = df_tsm[df_tsm["Name"] == "VT79"].copy()
 df_tsm = df_tsm.dropna(subset=["spm_nechad_665_mean"])
 df_tsm = df_tsm.rename(columns={"spm_nechad_665_mean": "TSM"})
 
@@ -22,17 +32,12 @@ high_thresh = np.percentile(df_tsm["TSM"], upper_percentile)
 
 df_tsm = df_tsm[(df_tsm["TSM"] >= low_thresh) & (df_tsm["TSM"] <= high_thresh)].copy()
 
-df_discharge["date"] = pd.to_datetime(df_discharge["datetime"]).dt.tz_localize(None)
+df_discharge["date"] = df_discharge["datetime"]
 df_tsm["pixel_time"] = pd.to_datetime(df_tsm["pixel_time"]).dt.tz_localize(None)
 
 df_discharge = df_discharge.sort_values("date")
 df_tsm = df_tsm.sort_values("pixel_time")
 
-years = range(2018, 2024)
-param_name = "TSM_665"
-riv_name = "Flåm bru"
-station = "72.77.0"
-
 fig, axes = plt.subplots(3, 2, figsize=(14, 12), sharex=False)
 axes = axes.flatten()
 
@@ -43,7 +48,7 @@ for i, year in enumerate(years):
     end_date = pd.to_datetime(f"{year}-12-31")
 
     # Filter data for current year
-    d_dis = df_discharge[(df_discharge["date"] >= start_date) & (df_discharge["date"] <= end_date)]
+    d_dis = df_discharge[df_discharge["year"] == year]
     d_tsm = df_tsm[(df_tsm["pixel_time"] >= start_date) & (df_tsm["pixel_time"] <= end_date)]
 
     # Left axis: river discharge
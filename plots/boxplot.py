@@ -1,6 +1,9 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extra"))
+from data_cache import load_insitu
 
 choice = 2
 station = {
@@ -10,18 +13,12 @@ station = {
 }
 station_name = station[choice]
 
-file_path = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/MS_In_situ_Vannmiljo_lakes_coastals.xlsx"
 output_folder = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/plots/box_plots/used"
 os.makedirs(output_folder, exist_ok=True)
 
-df = pd.read_excel(file_path)
-
-df = df[(df['Nedre dyp'] >= 0) & (df['Nedre dyp'] <= 5)]
-
-time_col = "Prøvetakingstidspunkt"
-df[time_col] = pd.to_datetime(df[time_col], errors="coerce")
-
-df_station = df[df["s"] == station_name].copy().dropna(subset=[time_col])
+# in-situ 0–5 m for the chosen station from the Parquet cache
+time_col = "date"
+df_station = load_insitu(stations=station_name, depth=(0, 5)).dropna(subset=[time_col])
 df_station["Year"] = df_station[time_col].dt.year
 df_station["Month"] = df_station[time_col].dt.month
 
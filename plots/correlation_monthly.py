@@ -1,106 +1,49 @@
-import pandas as pd
 import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.stats import pearsonr
 
-file1 = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/MS_In_situ_Vannmiljo_lakes_coastals.xlsx"
-file2 = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/Sentinel3_pixel_clean_correlation.xlsx"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extra"))
+from data_cache import load_insitu, load_satellite
+from matchup import matchups
+from validation import validation_stats, bootstrap_stats
+
 output_folder = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/plots/correlation_plots"
 os.makedirs(output_folder, exist_ok=True)
 
-df1 = pd.read_excel(file1)
-df2 = pd.read_excel(file2)
-df2.columns = df2.columns.astype(str).str.strip()
-
-df1 = df1[(df1['Nedre dyp'] >= 0) & (df1['Nedre dyp'] <= 5)]
+# in-situ 0–5 m from the Parquet cache (date / Station already renamed)
+df1 = load_insitu(depth=(0, 5))
 
 parameter_name = "KLFA" # change here 
-df1 = df1.rename(columns={
-    parameter_name: "Parameter", 
-    "Prøvetakingstidspunkt": "date", 
-    "s": "Station"
-})
-
 sat_parameter = "chl_c2rcc"  # change here
 
-# Verify that the sat_parameter column exists before assignment
-if sat_parameter not in df2.columns:
-    raise KeyError(f"Column '{sat_parameter}' not found in df2. Available columns: {list(df2.columns)}")
-
-# Explicit assignment (NOT rename)
-df2["Parameter"] = df2[sat_parameter]
-df2["date"] = df2["pixel_time"]
-df2["Station"] = df2["Name"]
-
-# Convert date columns
-df1['date'] = pd.to_datetime(df1['date'])
-df2['date'] = pd.to_datetime(df2['date'])
-
-stations = sorted(set(df1['Station']).intersection(set(df2['Station'])))
-
-combined_df = []
-
-for station in stations:
-
-    df1_station = df1[df1['Station'] == station].copy()
-    df2_station = df2[df2['Station'] == station].copy()
-
-    df1_station['Year'] = pd.to_datetime(df1_station['date']).dt.year
-    df1_station['Month'] = pd.to_datetime(df1_station['date']).dt.month
+# per-pixel clean table, only the satellite column needed (KeyError if it does not exist)
+df2 = load_satellite(columns=[sat_parameter], kind="correlation")
 
-    df2_station['Year'] = pd.to_datetime(df2_station['date']).dt.year
-    df2_station['Month'] = pd.to_datetime(df2_station['date']).dt.month
+# Monthly means per station and year, keeping only months where BOTH datasets have data
+df_all = matchups(df1, df2, {parameter_name: sat_parameter}, how="month")
+df_all = df_all.rename(columns={"insitu": "Parameter_in-situ", "satellite": "Parameter_satellite"})
 
-    # Monthly averages per year (drop NaN)
-    df1_monthly = (
-        df1_station.groupby(['Year', 'Month'])['Parameter']
-        .mean()
-        .dropna()
-        .reset_index()
-    )
-
-    df2_monthly = (
-        df2_station.groupby(['Year', 'Month'])['Parameter']
-        .mean()
-        .dropna()
-        .reset_index()
-    )
-
-    # Keeps only months where BOTH datasets have data
-    df_corr = pd.merge(
-        df1_monthly,
-        df2_monthly,
-        on=['Year', 'Month'],
-        how='inner',
-        suffixes=('_in-situ', '_satellite')
-    )
-
-    if df_corr.empty:
-        continue
-
-    df_corr['Station'] = station
-    combined_df.append(df_corr)
-
-# Combine all stations
-df_all = pd.concat(combined_df, ignore_index=True)
+stations = sorted(df_all['Station'].unique())
 
 x = df_all['Parameter_in-situ'].values
 y = df_all['Parameter_satellite'].values
 
-corr, pval = pearsonr(x, y)
-rmse = np.sqrt(np.mean((y - x)**2))
-bias = np.mean(y - x)
+stats = validation_stats(x, y)
+corr, pval, rmse, bias = stats["r"], stats["p_value"], stats["rmse"], stats["bias"]
 
 # RMA regression
-r = np.corrcoef(x, y)[0, 1]
-slope_rma = np.sign(r) * (np.std(y, ddof=1) / np.std(x, ddof=1))
-intercept_rma = np.mean(y) - slope_rma * np.mean(x)
+slope_rma, intercept_rma = stats["slope_rma"], stats["intercept_rma"]
 
 print("Global statistics:")
 print(f"  r = {corr:.3f}, RMSE = {rmse:.3f}, Bias = {bias:.3f}")
 print(f"  RMA: y = {intercept_rma:.3f} + {slope_rma:.3f}x")
 
+# 95 % bootstrap confidence intervals
+ci = bootstrap_stats(x, y, n_boot=10_000)
+for name in ["r", "rmse", "bias", "slope_rma", "intercept_rma"]:
+    print(f"  {name}: [{ci[name + '_lo']:.3f}, {ci[name + '_hi']:.3f}]")
+
 # plot combined
 plt.figure(figsize=(7, 7))
 colors = plt.cm.viridis(np.linspace(0, 1, len(stations)))
@@ -160,13 +103,9 @@ for station in stations:
         continue
 
     # Stats
-    corr, pval = pearsonr(x, y)
-    rmse = np.sqrt(np.mean((y - x) ** 2))
-    bias = np.mean(y - x)
-
-    r = np.corrcoef(x, y)[0, 1]
-    slope_rma = np.sign(r) * (np.std(y, ddof=1) / np.std(x, ddof=1))
-    intercept_rma = np.mean(y) - slope_rma * np.mean(x)
+    stats = validation_stats(x, y)
+    corr, pval, rmse, bias = stats["r"], stats["p_value"], stats["rmse"], stats["bias"]
+    slope_rma, intercept_rma = stats["slope_rma"], stats["intercept_rma"]
 
     plt.figure(figsize=(6, 6))
     plt.scatter(x, y, alpha=0.8, color='royalblue', edgecolor='k', s=60)
@@ -1,57 +1,30 @@
-import pandas as pd
-import glob
 import os
+import sys
 import matplotlib.pyplot as plt
 
-data_folder = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/NVE_data/discharge/"
-plot_folder = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/plots/cumulative"
-os.makedirs(plot_folder, exist_ok=True)
-
-csv_files = glob.glob(os.path.join(data_folder, "*.csv"))
-
-all_data = []
-
-for file in csv_files:
-    station_name = os.path.splitext(os.path.basename(file))[0]
-
-    try:
-        df = pd.read_csv(file)
-        df["datetime"] = pd.to_datetime(df["datetime"])
-
-        # filter years
-        df = df[(df["datetime"].dt.year >= 2018) & (df["datetime"].dt.year <= 2023)]
-        if df.empty:
-            continue
-
-        df["station"] = station_name
-        df["year"] = df["datetime"].dt.year
-        df["day_of_year"] = df["datetime"].dt.dayofyear
-        df["month"] = df["datetime"].dt.month
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "NVE"))
+from discharge_stats import load_discharge_stats
 
-        # cumulative discharge per station per year
-        df["cumulative_discharge"] = (
-            df.groupby(["station", "year"])["value"].cumsum()
-        )
+# year range to analyse (inclusive)
+start_year = 2018
+end_year = 2023
+year_range = f"{start_year}–{end_year}"
 
-        all_data.append(df)
-
-    except Exception as e:
-        print(f"Error processing file {file}: {e}")
+plot_folder = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/plots/cumulative"
+os.makedirs(plot_folder, exist_ok=True)
 
-df_all = pd.concat(all_data, ignore_index=True)
+# cumulative sums, day-of-year means and totals for all stations in one pass
+stats = load_discharge_stats(years=range(start_year, end_year + 1))
 
-#  statistics
-df_summary = (
-    df_all.groupby(["year", "day_of_year"])["cumulative_discharge"]
-    .mean()
-    .reset_index()
-)
-
-yearly_totals_all = df_all.groupby("year")["value"].sum()
+df_summary = stats["mean_cumulative"]
+df_mean_daily = stats["mean_daily"]
+yearly_totals_all = stats["annual_totals"]
 
 # consistent colors per year
 distinct_colors = ["#076C4E", "#d95f02", "#7570b3", "#e7298a", "#7acf18", "#e6ab02"]
 years = sorted(yearly_totals_all.index)
+if len(years) > len(distinct_colors):
+    distinct_colors = [plt.cm.tab20(i % 20) for i in range(len(years))]
 year_color_map = dict(zip(years, distinct_colors))
 
 
@@ -69,7 +42,7 @@ for year, group in df_summary.groupby("year"):
 
 plt.xlabel("Day of Year (1–365)")
 plt.ylabel("Average cumulative discharge (m³/s·day)")
-plt.title("Yearly cumulative freshwater discharge (2018–2023, all stations)")
+plt.title(f"Yearly cumulative freshwater discharge ({year_range}, all stations)")
 plt.legend(
     title="Year (total discharge - m³/s)",
     bbox_to_anchor=(1.05, 1),
@@ -89,7 +62,7 @@ plt.bar(yearly_totals_all.index, yearly_totals_all.values)
 
 plt.ylabel("Total annual discharge (m³/s·day)")
 plt.xlabel("Year")
-plt.title("Total yearly freshwater discharge per year (2018–2023)")
+plt.title(f"Total yearly freshwater discharge per year ({year_range})")
 plt.tight_layout()
 
 save_path = os.path.join(plot_folder, "total_yearly_discharge_bar.png")
@@ -99,12 +72,6 @@ plt.close()
 print(f"Saved: {save_path}")
 
 # PLOT 3 — MEAN DAILY DISCHARGE (NON-CUMULATIVE)
-df_mean_daily = (
-    df_all.groupby(["year", "day_of_year"])["value"]
-    .mean()
-    .reset_index()
-)
-
 plt.figure(figsize=(14, 6))
 
 for year, group in df_mean_daily.groupby("year"):
@@ -118,7 +85,7 @@ for year, group in df_mean_daily.groupby("year"):
 
 plt.xlabel("Day of year (1–365)")
 plt.ylabel("Mean daily discharge (m³/s)")
-plt.title("Mean daily freshwaterdischarge by year (2018–2023, all stations)")
+plt.title(f"Mean daily freshwaterdischarge by year ({year_range}, all stations)")
 plt.legend(
     title="Year",
     bbox_to_anchor=(1.05, 1),
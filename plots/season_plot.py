@@ -1,107 +1,12 @@
 import os
-import re
+import sys
 import numpy as np
-import xarray as xr
-from netCDF4 import Dataset
-import matplotlib.pyplot as plt
-from datetime import datetime
-
-param_info = {
-    "conc_chl_mean": {
-        "label": "Chlorophyll-a concentration",
-        "units": "mg m$^{-3}$",
-        "vmin_mean": 0,
-        "vmax_mean": 7,
-        "vmin_std": 0,
-        "vmax_std": 14,
-        "cmap_mean": "viridis",
-        "cmap_std": "magma",
-    },
-    "iop_adg_mean": {
-        "label": "CDOM + detritus absorption (a$_{dg}$)",
-        "units": "m$^{-1}$",
-        "vmin_mean": 0,
-        "vmax_mean": 2,
-        "vmin_std": 0,
-        "vmax_std": 7,
-        "cmap_mean": "viridis",
-        "cmap_std": "magma",
-    },
-    "kd489_mean": {
-        "label": "Diffuse attenuation coefficient Kd(489)",
-        "units": "m$^{-1}$",
-        "vmin_mean": 0,
-        "vmax_mean": 2,
-        "vmin_std": 0,
-        "vmax_std": 7,
-        "cmap_mean": "viridis",
-        "cmap_std": "magma",
-    },
-    "c2rcc_secchi_depth_3_mean": {
-        "label": "Secchi depth",
-        "units": "m",
-        "vmin_mean": 0,
-        "vmax_mean": 20,
-        "vmin_std": 0,
-        "vmax_std": 20,
-        "cmap_mean": "viridis",
-        "cmap_std": "magma",
-    },
-    "spm_nechad_665_mean": {
-        "label": "SPM (Nechad 665)",
-        "units": "g m$^{-3}$",
-        "vmin_mean": 0,
-        "vmax_mean": 2,
-        "vmin_std": 0,
-        "vmax_std": 2,
-        "cmap_mean": "viridis",
-        "cmap_std": "magma",
-    },
-    "spm_nechad_865_mean": {
-        "label": "SPM (Nechad 865)",
-        "units": "g m$^{-3}$",
-        "vmin_mean": 0,
-        "vmax_mean": 2,
-        "vmin_std": 0,
-        "vmax_std": 5,
-        "cmap_mean": "viridis",
-        "cmap_std": "magma",
-    },
-    "tur_nechad_665_mean": {
-        "label": "Turbidity (Nechad 665)",
-        "units": "FNU",
-        "vmin_mean": 0,
-        "vmax_mean": 2,
-        "vmin_std": 0,
-        "vmax_std": 2,
-        "cmap_mean": "viridis",
-        "cmap_std": "magma",
-    },
-    "tur_nechad_865_mean": {
-        "label": "Turbidity (Nechad 865)",
-        "units": "FNU",
-        "vmin_mean": 0,
-        "vmax_mean": 2,
-        "vmin_std": 0,
-        "vmax_std": 5,
-        "cmap_mean": "viridis",
-        "cmap_std": "magma",
-    },
-    "chl_c2rcc_mean": {
-        "label": "Chlorophyll-a (C2RCC)",
-        "units": "mg m$^{-3}$",
-        "vmin_mean": 0,
-        "vmax_mean": 2,
-        "vmin_std": 0,
-        "vmax_std": 2,
-        "cmap_mean": "viridis",
-        "cmap_std": "magma",
-    },
-}
 
-main_folder = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/L3_daily"
-plot_output = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/plots/avg_plots/test"
-os.makedirs(plot_output, exist_ok=True)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extra"))
+from l3_params import PARAM_INFO, l3_folder, plots_folder, read_l3_param
+
+main_folder = l3_folder
+plot_output = os.path.join(plots_folder, "avg_plots", "test")
 
 seasons = {
     "Spring Bloom (Mar–Apr)": [3, 4],
@@ -109,66 +14,37 @@ seasons = {
     "Autumn (Sep–Oct)": [9, 10],
 }
 
-# LOOP OVER PARAMETERS
-for param_name, meta in param_info.items():
-
-    print(f"Processing seasonal plots for: {param_name}")
-
-    seasonal_data = {season: [] for season in seasons}
-    lat, lon = None, None
-
-    for root, _, files in os.walk(main_folder):
-        for f in files:
-            if not f.endswith(".nc"):
-                continue
-
-            # Extract date from filename
-            try:
-                date_str = re.search(r"\d{8}", f).group(0)
-                file_date = datetime.strptime(date_str, "%Y%m%d")
-            except Exception:
-                continue
-
-            fpath = os.path.join(root, f)
-
-            try:
-                with Dataset(fpath, mode="r") as ds:
-                    if param_name not in ds.variables:
-                        continue
-
-                    arr = ds.variables[param_name][:].astype(float)
-
-                    if lat is None and "lat" in ds.variables and "lon" in ds.variables:
-                        lat = ds.variables["lat"][:]
-                        lon = ds.variables["lon"][:]
 
-                    for season_name, months in seasons.items():
-                        if file_date.month in months:
-                            seasonal_data[season_name].append(arr)
+def seasonal_maps(param_name, folder=main_folder, seasons=seasons):
+    """
+    Mean and standard deviation maps of one variable per season (files
+    without a date in the name are skipped). Returns (lat, lon, {season: mean},
+    {season: std}) or None when no file has the variable.
+    """
 
-            except Exception as e:
-                print(f"Skipped {fpath}: {e}")
+    read = read_l3_param(param_name, folder=folder, require_date=True)
+    if read is None:
+        return None
+    lat, lon, dates, stack = read
+    months = dates.astype("datetime64[M]").astype(int) % 12 + 1
 
-
-    # COMPUTE SEASONAL STATS
     seasonal_mean = {}
     seasonal_std = {}
-
-    for season_name, data_list in seasonal_data.items():
-        if len(data_list) == 0:
+    for season_name, season_months in seasons.items():
+        in_season = np.isin(months, season_months)
+        if not in_season.any():
             print(f"⚠️ No data for {season_name} ({param_name})")
             continue
+        seasonal_mean[season_name] = np.nanmean(stack[in_season], axis=0)
+        seasonal_std[season_name] = np.nanstd(stack[in_season], axis=0)
+    return lat, lon, seasonal_mean, seasonal_std
 
-        stack = np.stack(data_list)
-        seasonal_mean[season_name] = np.nanmean(stack, axis=0)
-        seasonal_std[season_name] = np.nanstd(stack, axis=0)
 
-    if not seasonal_mean:
-        print(f" No seasonal data found for {param_name}")
-        continue
+def plot_seasonal(meta, lat, lon, seasonal_mean, seasonal_std, outfile, seasons=seasons):
+    import xarray as xr
+    import matplotlib.pyplot as plt
 
-    # PLOTTING
-    fig, axes = plt.subplots(3, 2, figsize=(15, 15))
+    fig, axes = plt.subplots(len(seasons), 2, figsize=(15, 5 * len(seasons)), squeeze=False)
 
     for i, season_name in enumerate(seasons.keys()):
 
@@ -191,7 +67,7 @@ for param_name, meta in param_info.items():
 
         mean_da.plot(
             ax=axes[i, 0],
-            cmap="viridis",
+            cmap=meta["cmap_mean"],
             vmin=meta["vmin_mean"],
             vmax=meta["vmax_mean"],
             cbar_kwargs={"label": meta["units"]},
@@ -200,7 +76,7 @@ for param_name, meta in param_info.items():
 
         std_da.plot(
             ax=axes[i, 1],
-            cmap="magma",
+            cmap=meta["cmap_std"],
             vmin=meta["vmin_std"],
             vmax=meta["vmax_std"],
             cbar_kwargs={"label": meta["units"]},
@@ -208,10 +84,26 @@ for param_name, meta in param_info.items():
         axes[i, 1].set_title(f"{season_name} – Std {meta['label']}")
 
     plt.tight_layout()
-    outfile = os.path.join(plot_output, f"{param_name}_seasonal_mean_std.png")
     plt.savefig(outfile, dpi=300)
     plt.close()
 
-    print(f"Saved: {outfile}")
 
-print(" All seasonal plots completed.")
+if __name__ == "__main__":
+    os.makedirs(plot_output, exist_ok=True)
+
+    # LOOP OVER PARAMETERS
+    for param_name, meta in PARAM_INFO.items():
+
+        print(f"Processing seasonal plots for: {param_name}")
+
+        maps = seasonal_maps(param_name)
+        if maps is None or not maps[2]:
+            print(f" No seasonal data found for {param_name}")
+            continue
+
+        outfile = os.path.join(plot_output, f"{param_name}_seasonal_mean_std.png")
+        plot_seasonal(meta, *maps, outfile)
+
+        print(f"Saved: {outfile}")
+
+    print(" All seasonal plots completed.")
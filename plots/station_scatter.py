@@ -1,6 +1,9 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extra"))
+from data_cache import load_insitu, load_satellite
 
 
 choice = 1
@@ -11,25 +14,12 @@ STATIONS = {
 }
 station_name = STATIONS[choice]
 
-file1 = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/MS_In_situ_Vannmiljo_lakes_coastals.xlsx"
-file2 = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/data/Sentinel3_pixel_clean.xlsx"
-
+# in-situ 0–5 m for the chosen station from the Parquet cache
+df1_station = load_insitu(stations=station_name, depth=(0, 5))
 
-df1 = pd.read_excel(file1)
-df2 = pd.read_excel(file2)
-
-time_col1 = "Prøvetakingstidspunkt"
+time_col1 = "date"
 time_col2 = "pixel_time"
 
-df1[time_col1] = pd.to_datetime(df1[time_col1], errors="coerce")
-df2[time_col2] = pd.to_datetime(df2[time_col2], errors="coerce")
-
-df1 = df1[
-    (df1["Nedre dyp"] >= 0) & (df1["Nedre dyp"] <= 5)]
-
-df1_station = df1[df1["s"] == station_name].copy()
-df2_station = df2[df2["Name"] == station_name].copy()
-
 param_map = {
     "CDOM": "iop_adg_mean",
     "TSM": "spm_nechad_865_mean",
@@ -38,6 +28,9 @@ param_map = {
     "SECCI": "c2rcc_secchi_depth_3_mean",
 }
 
+# only the mapped satellite columns for the chosen station from the Parquet copy
+df2_station = load_satellite(columns=param_map.values(), stations=station_name)
+
 param_units = {
     "CDOM": r"m$^{-1}$",
     "TSM": r"g m$^{-3}$",
@@ -0,0 +1,105 @@
+import os
+import sys
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "extra"))
+from data_cache import load_insitu, load_satellite, satellite_columns
+from matchup import matchups
+from validation import validation_table
+
+output_folder = "/Users/emma/Library/CloudStorage/OneDrive-DanmarksTekniskeUniversitet/Thesis/plots/correlation_plots"
+
+# in-situ parameter -> satellite counterparts in the per-pixel clean table
+# (the "clean" table has their 3x3 box means as <col>_mean, see sat_columns)
+VALIDATION_MAP = {
+    "CDOM": ["iop_adg", "iop_agelb"],
+    "TSM": ["conc_tsm", "spm_nechad_665", "spm_nechad_865"],
+    "TURB": ["tur_nechad_665", "tur_nechad_865"],
+    "KLFA": ["chl_c2rcc", "conc_chl", "chl_oc4", "chl_merged_pitarch10_50", "chl_calib_c2rcc", "chl"],
+    "SECCI": ["c2rcc_secchi_depth_1", "c2rcc_secchi_depth_2", "c2rcc_secchi_depth_3", "c2rcc_secchi_depth_4"],
+}
+
+how = "month"         # "month", "day" or "nearest"
+kind = "correlation"  # "correlation" (per-pixel) or "clean" (3x3 box means, <col>_mean columns)
+n_boot = 10_000       # bootstrap resamples for the CIs (0 = point estimates only)
+make_plots = True
+n_workers = 4
+
+
+# VALIDATION_MAP names as they appear in the table of the given kind
+def sat_columns(cols, kind):
+    return [f"{c}_mean" for c in cols] if kind == "clean" else list(cols)
+
+
+def plot_pair(job):
+    df_pair, stats, title, save_path = job
+
+    x = df_pair["insitu"].values
+    y = df_pair["satellite"].values
+
+    fig, ax = plt.subplots(figsize=(6, 6))
+    ax.scatter(x, y, alpha=0.8, color="royalblue", edgecolor="k", s=60)
+
+    # RMA regression line
+    min_val = min(np.min(x), np.min(y))
+    max_val = max(np.max(x), np.max(y))
+    x_line = np.linspace(min_val, max_val, 100)
+    y_rma = stats["intercept_rma"] + stats["slope_rma"] * x_line
+    ax.plot(x_line, y_rma, color="red", linewidth=2,
+            label=f"RMA: y={stats['intercept_rma']:.2f}+{stats['slope_rma']:.2f}x")
+
+    ax.set_title(f"{title}\nr={stats['r']:.2f}, RMSE={stats['rmse']:.2f}, Bias={stats['bias']:.2f}")
+    ax.set_xlabel(f"In-situ ({how})")
+    ax.set_ylabel(f"Satellite ({how})")
+    ax.grid(True)
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(save_path, dpi=300, bbox_inches="tight")
+    plt.close(fig)
+    return save_path
+
+
+if __name__ == "__main__":
+    os.makedirs(output_folder, exist_ok=True)
+
+    # in-situ 0–5 m and only the satellite columns that exist in the Parquet copy
+    df1 = load_insitu(depth=(0, 5))
+    available = set(satellite_columns(kind))
+    params = {
+        p: [c for c in sat_columns(sat_cols, kind) if c in available]
+        for p, sat_cols in VALIDATION_MAP.items()
+        if p in df1.columns
+    }
+    params = {p: cols for p, cols in params.items() if cols}
+    sat_cols = sorted({c for cols in params.values() for c in cols})
+
+    df2 = load_satellite(columns=sat_cols, kind=kind)
+
+    # all pairs, stations and parameters in one pass
+    pairs = matchups(df1, df2, params, how=how)
+    table = validation_table(pairs, n_boot=n_boot)
+
+    table_path = os.path.join(output_folder, f"validation_{how}_{kind}.csv")
+    table.to_csv(table_path, index=False)
+    print(table.to_string(index=False))
+    print(f"Saved validation table: {table_path}")
+
+    if make_plots:
+        jobs = []
+        for row in table.itertuples(index=False):
+            if row.n < 2:
+                continue
+            sel = (pairs["parameter"] == row.parameter) & (pairs["satellite_parameter"] == row.satellite_parameter)
+            if row.Station != "all":
+                sel &= pairs["Station"] == row.Station
+            title = f"{row.Station}\n{row.parameter} vs {row.satellite_parameter}"
+            filename = f"validation_{how}_{row.parameter}_{row.satellite_parameter}_{str(row.Station).replace(' ', '_')}.png"
+            jobs.append((pairs[sel], row._asdict(), title, os.path.join(output_folder, filename)))
+
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            for save_path in pool.map(plot_pair, jobs):
+                print(f"Saved plot: {save_path}")